@@ -0,0 +1,57 @@
+"""
+Compares the streaming lxml parser with the pandas.read_html path on saved stat pages
+
+    python benchmarks/bench_parser.py --season 2022
+    python benchmarks/bench_parser.py --fixtures recorded --season 2021
+
+The fixtures directory is laid out like the website, e.g. benchmarks/fixtures/leagues/NBA_2022_per_game.html. The default one is
+committed and regenerated by benchmarks/make_fixtures.py, pages recorded from the site with NBANALYZER_FETCH_MODE=record work as well.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from nbanalyzer.basketball_reference_api import read_html_players_data, stat_type_header
+from nbanalyzer.html_parser import TABLE_IDS, SCHEMAS, parse_stats_table
+
+def measure(func, repeat: int) -> tuple[float, int]:
+    """
+    Returns the best wall time in seconds and the peak traced memory in bytes of func
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fixtures', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures'))
+    parser.add_argument('--season', type=int, default=2022)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f'{"stat type":<14}{"read_html ms":>14}{"lxml ms":>10}{"speedup":>9}{"read_html KiB":>15}{"lxml KiB":>10}')
+    for stat_type, table_id in TABLE_IDS.items():
+        path = os.path.join(args.fixtures, 'leagues', f'NBA_{args.season}_{stat_type}.html')
+        if not os.path.exists(path):
+            print(f'{stat_type:<14}no page for {args.season}')
+            continue
+        with open(path, encoding='utf-8') as f:
+            page = f.read()
+        header = stat_type_header(stat_type)
+
+        old_time, old_peak = measure(lambda: read_html_players_data(page, header), args.repeat)
+        new_time, new_peak = measure(lambda: parse_stats_table(page, table_id, header, SCHEMAS[stat_type]), args.repeat)
+        print(f'{stat_type:<14}{old_time * 1e3:>14.1f}{new_time * 1e3:>10.1f}{old_time / new_time:>8.1f}x{old_peak / 1024:>15.0f}{new_peak / 1024:>10.0f}')
+
+if __name__ == '__main__':
+    main()
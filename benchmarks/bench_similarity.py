@@ -0,0 +1,47 @@
+"""
+Measures similarity index build time and query latency on synthetic player seasons
+
+    python benchmarks/bench_similarity.py --rows 25000
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from nbanalyzer.similarity import SIMILARITY_FEATURES, SimilarityIndex, zscore_by_season
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=25000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--batch', type=int, default=64)
+    parser.add_argument('-k', type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    seasons = pd.Series(rng.integers(1977, 2023, args.rows))
+    features = pd.DataFrame(rng.normal(size=(args.rows, len(SIMILARITY_FEATURES))), columns=SIMILARITY_FEATURES)
+    keys = pd.DataFrame({'Season': seasons, 'PlayerID': [f'player-{i}' for i in range(args.rows)], 'Player': ''})
+
+    start = time.perf_counter()
+    index = SimilarityIndex(keys, zscore_by_season(features, seasons).to_numpy(dtype=np.float32))
+    print(f'build: {(time.perf_counter() - start) * 1e3:.1f} ms for {len(index)} player seasons x {len(SIMILARITY_FEATURES)} features')
+
+    rows = rng.integers(0, len(index), args.queries)
+    start = time.perf_counter()
+    for row in rows:
+        index.similar_players(int(keys.Season[row]), keys.PlayerID[row], args.k)
+    single = (time.perf_counter() - start) / args.queries
+    print(f'single query: {single * 1e3:.2f} ms')
+
+    start = time.perf_counter()
+    for batch in np.array_split(rows, max(1, args.queries // args.batch)):
+        index.search(index.matrix[batch], args.k, exclude=batch)
+    batched = (time.perf_counter() - start) / args.queries
+    print(f'batched query ({args.batch} per batch): {batched * 1e3:.3f} ms per player')
+
+if __name__ == '__main__':
+    main()
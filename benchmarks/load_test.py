@@ -0,0 +1,128 @@
+"""
+Load test of the app against recorded basketball reference pages served by the stub server
+
+    python benchmarks/load_test.py --sessions 40 --concurrency 8
+    python benchmarks/load_test.py --sessions 40 --concurrency 8 --latency 0.2 --seed 1
+
+Every simulated session runs nba_app.py headless, picks a season among the recorded ones and opens a few sections, chosen from
+a seeded generator so two runs replay the same sessions. Sessions run in --concurrency processes, the test runtime of Streamlit
+is global to a process. Pages come from the stub server into a throwaway warehouse shared by the processes, nothing touches
+the network. Reports the throughput, the latency percentiles of the script runs and the requests the stub answered.
+"""
+import argparse
+import os
+import random
+import re
+import socket
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_FIXTURES = os.path.join(ROOT, 'benchmarks', 'fixtures')
+APP_SEASONS = range(1977, 2023)
+SECTIONS = ['MVP', 'heatmap', 'scoring plot', 'shooting plot', 'playmaking plot']
+TIMEOUT_SECONDS = 120
+
+def recorded_seasons(fixtures: str) -> list[int]:
+    """
+    Returns the seasons of the app whose per game page is recorded
+    """
+    pages = os.listdir(os.path.join(fixtures, 'leagues'))
+    seasons = {int(m.group(1)) for m in map(re.compile(r'NBA_(\d+)_per_game\.html$').match, pages) if m}
+    return sorted(seasons.intersection(APP_SEASONS))
+
+def plan_sessions(sessions: int, seasons: list[int], seed: int) -> list[tuple]:
+    """
+    Returns the (season, sections) visited by every session
+    """
+    rng = random.Random(seed)
+    return [(rng.choice(seasons), rng.sample(SECTIONS, rng.randint(0, 2))) for _ in range(sessions)]
+
+def run_session(season: int, sections: list[str]) -> dict:
+    from streamlit.testing.v1 import AppTest
+    latencies = []
+
+    def run(at):
+        start = time.perf_counter()
+        at.run(timeout=TIMEOUT_SECONDS)
+        latencies.append(time.perf_counter() - start)
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+
+    # The app runs as __main__, the worker needs its own __main__ back to unpickle the next session
+    main_module = sys.modules['__main__']
+    at = AppTest.from_file(os.path.join(ROOT, 'nba_app.py'), default_timeout=TIMEOUT_SECONDS)
+    try:
+        run(at)
+        at.sidebar.selectbox[0].set_value(season)
+        run(at)
+        for section in sections:
+            checkboxes = [checkbox for checkbox in at.checkbox if checkbox.key == f'show {section}']
+            if checkboxes:
+                checkboxes[0].check()
+                run(at)
+        error = None
+    except Exception as e:
+        error = f'{season}: {e}'
+    finally:
+        sys.modules['__main__'] = main_module
+    return {'latencies': latencies, 'error': error}
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def percentile(values: list[float], q: float) -> float:
+    return statistics.quantiles(values, n=100, method='inclusive')[q - 1] if len(values) > 1 else values[0]
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES)
+    parser.add_argument('--sessions', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency', type=float, default=0., help='seconds the stub server adds to every page')
+    args = parser.parse_args()
+
+    fixtures = os.path.abspath(args.fixtures)
+    seasons = recorded_seasons(fixtures)
+    if not seasons:
+        print(f'No recorded season in {fixtures}', file=sys.stderr)
+        return 1
+
+    # The library reads its settings when imported, the app reads the favicon from the working directory
+    port = free_port()
+    os.environ['NBANALYZER_BASE_URL'] = f'http://127.0.0.1:{port}/'
+    os.environ['NBANALYZER_WAREHOUSE'] = tempfile.mkdtemp(prefix='nbanalyzer-load-')
+    os.environ['NBANALYZER_FETCH_MODE'] = 'live'
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    from nbanalyzer.stub_server import serve
+    server = serve(fixtures, port, latency=args.latency)
+
+    plan = plan_sessions(args.sessions, seasons, args.seed)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(run_session, *zip(*plan)))
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    latencies = [latency for result in results for latency in result['latencies']]
+    errors = [result['error'] for result in results if result['error']]
+    print(f'{args.sessions} sessions, {len(latencies)} script runs in {elapsed:.1f}s on {args.concurrency} processes')
+    print(f'throughput: {args.sessions / elapsed:.2f} sessions/s, {len(latencies) / elapsed:.2f} runs/s')
+    if latencies:
+        print(f'run latency ms: p50 {percentile(latencies, 50) * 1e3:.0f}  p95 {percentile(latencies, 95) * 1e3:.0f}  '
+              f'max {max(latencies) * 1e3:.0f}')
+    print(f'stub requests: {server.requests}, throttled: {server.throttled}')
+    print(f'errors: {len(errors)}')
+    for error in errors:
+        print(f'  {error}', file=sys.stderr)
+    return 1 if errors else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,247 @@
+"""
+Writes a small deterministic set of basketball reference pages for the benchmarks, the load test and the tests
+
+    python benchmarks/make_fixtures.py
+    python benchmarks/make_fixtures.py --seasons 1990,2022 --players 120 --output benchmarks/fixtures
+
+Pages are laid out like the website, leagues/NBA_2022_per_game.html, ..., awards/awards_2022.html, with the same tables, column
+headers, repeated header rows, traded players (a TOT row followed by one row per team) and Hall of Famers marked with a *. The
+stats are drawn from a generator seeded with the season, so the same command always writes the same bytes.
+"""
+import argparse
+import os
+import random
+import sys
+from html import escape
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from nbanalyzer.basketball_reference_api import FIRST_PLAY_BY_PLAY_SEASON
+
+DEFAULT_OUTPUT = os.path.join(ROOT, 'benchmarks', 'fixtures')
+DEFAULT_SEASONS = [1990, 2022]
+DEFAULT_PLAYERS = 120
+HEADER_EVERY = 20
+
+STARS = {
+    1990: ['Magic Johnson*', 'Charles Barkley*', 'Michael Jordan*', 'Karl Malone*', 'Patrick Ewing*', 'Hakeem Olajuwon*',
+           'David Robinson*', 'Kevin Johnson', 'Larry Bird*', 'Tom Chambers'],
+    2022: ['Nikola Jokić', 'Joel Embiid', 'Giannis Antetokounmpo', 'Devin Booker', 'Luka Dončić', 'Jayson Tatum', 'Ja Morant',
+           'Stephen Curry', 'Chris Paul', 'DeMar DeRozan', 'Kevin Durant', 'LeBron James'],
+}
+TEAMS = {
+    1990: ['ATL', 'BOS', 'CHH', 'CHI', 'CLE', 'DAL', 'DEN', 'DET', 'GSW', 'HOU', 'IND', 'LAC', 'LAL', 'MIA', 'MIL', 'MIN', 'NJN',
+           'NYK', 'ORL', 'PHI', 'PHO', 'POR', 'SAC', 'SAS', 'SEA', 'UTA', 'WSB'],
+    2022: ['ATL', 'BOS', 'BRK', 'CHI', 'CHO', 'CLE', 'DAL', 'DEN', 'DET', 'GSW', 'HOU', 'IND', 'LAC', 'LAL', 'MEM', 'MIA', 'MIL',
+           'MIN', 'NOP', 'NYK', 'OKC', 'ORL', 'PHI', 'PHO', 'POR', 'SAC', 'SAS', 'TOR', 'UTA', 'WAS'],
+}
+FIRST_NAMES = ['Aaron', 'Andre', 'Ben', 'Chris', 'Dale', 'Darius', 'Eric', 'Frank', 'Gary', 'Isaiah', 'Jalen', 'Jordan', 'Kyle', 'Luis',
+               'Marcus', 'Nate', 'Omar', 'Paul', 'Reggie', 'Sam', 'Terry', 'Tyrese', 'Victor', 'Zach', 'José', 'Goran', 'Nenê']
+LAST_NAMES = ['Adams', 'Brown', 'Carter', 'Dalton', 'Ellis', 'Fields', 'Green', 'Harris', 'Irving', 'Jackson', 'King', 'Lopez',
+              'Miller', 'Nance', 'Owens', 'Parker', 'Reed', 'Smith', 'Thompson', 'Vučević', 'Walker', 'Young', 'Šarić', 'Calderón']
+POSITIONS = ['PG', 'SG', 'SF', 'PF', 'C']
+COMBO_POSITIONS = ['PG-SG', 'SG-SF', 'SF-PF', 'PF-C']
+
+BIO = ['Rk', 'Player', 'Pos', 'Age', 'Tm', 'G']
+SHOOTING = ['FG', 'FGA', 'FG%', '3P', '3PA', '3P%', '2P', '2PA', '2P%']
+COUNTING = ['FT', 'FTA', 'FT%', 'ORB', 'DRB', 'TRB', 'AST', 'STL', 'BLK', 'TOV', 'PF', 'PTS']
+PER_36_STATS = ['FG', 'FGA', '3P', '3PA', '2P', '2PA', 'FT', 'FTA', 'ORB', 'DRB', 'TRB', 'AST', 'STL', 'BLK', 'TOV', 'PF', 'PTS']
+COLUMNS = {
+    'per_game': BIO + ['GS', 'MP'] + SHOOTING + ['eFG%'] + COUNTING,
+    'totals': BIO + ['GS', 'MP'] + SHOOTING + ['eFG%'] + COUNTING,
+    'per_minute': BIO + ['GS', 'MP'] + SHOOTING + COUNTING,
+    'per_poss': BIO + ['GS', 'MP'] + SHOOTING + COUNTING + ['', 'ORtg', 'DRtg'],
+    'advanced': BIO + ['MP', 'PER', 'TS%', '3PAr', 'FTr', 'ORB%', 'DRB%', 'TRB%', 'AST%', 'STL%', 'BLK%', 'TOV%', 'USG%', '',
+                       'OWS', 'DWS', 'WS', 'WS/48', '', 'OBPM', 'DBPM', 'BPM', 'VORP'],
+    'play-by-play': BIO + ['MP', 'PG%', 'SG%', 'SF%', 'PF%', 'C%', 'OnCourt', 'On-Off', 'BadPass', 'LostBall', 'Shoot', 'Off.',
+                           'Shoot', 'Off.', 'PGA', 'And1', 'Blkd'],
+}
+PLAY_BY_PLAY_GROUPS = [('', 7), ('Position Estimate', 5), ('+/- Per 100 Poss.', 2), ('Turnovers', 2), ('Fouls Committed', 2),
+                       ('Fouls Drawn', 2), ('Misc.', 3)]
+TABLE_IDS = {'per_game': 'per_game_stats', 'totals': 'totals_stats', 'per_minute': 'per_minute_stats', 'advanced': 'advanced_stats',
+             'per_poss': 'per_poss_stats', 'play-by-play': 'pbp_stats'}
+MVP_COLUMNS = ['Rank', 'Player', 'Age', 'Tm', 'First', 'Pts Won', 'Pts Max', 'Share', 'G', 'MP', 'PTS', 'TRB', 'AST', 'STL', 'BLK',
+               'FG%', '3P%', 'FT%', 'WS', 'WS/48']
+MVP_GROUPS = [('', 4), ('Voting', 4), ('Per Game', 8), ('Shooting', 3)]
+# Share of field goal attempts taken from 3 in each era
+THREE_POINT_RATE = {1990: (.0, .25), 2022: (.1, .65)}
+
+def pct(made: float, attempts: float) -> str:
+    return f'{made / attempts:.3f}'.lstrip('0') if attempts > 0 else ''
+
+def names(rng: random.Random, season: int, players: int) -> list[str]:
+    chosen = list(STARS.get(season, []))
+    seen = set(chosen)
+    while len(chosen) < players:
+        name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+        if name not in seen:
+            seen.add(name)
+            chosen.append(name)
+    return chosen
+
+def profile(rng: random.Random, season: int, name: str, star: bool) -> dict:
+    """
+    Returns the per 36 minutes rates and playing time of a player, the pages are derived from it
+    """
+    low, high = THREE_POINT_RATE.get(season, THREE_POINT_RATE[2022])
+    fga = rng.uniform(17, 24) if star else rng.uniform(7, 17)
+    three_rate = rng.uniform(low, high)
+    fg3a = fga * three_rate
+    fg3 = fg3a * rng.uniform(.25, .42) if fg3a >= .1 else 0.
+    fg2a = fga - fg3a
+    fg2 = fg2a * rng.uniform(.42, .58)
+    fta = fga * rng.uniform(.15, .45)
+    ft = fta * rng.uniform(.6, .9)
+    orb, drb = rng.uniform(.5, 4), rng.uniform(2, 9)
+    return {
+        'name': name, 'pos': rng.choice(COMBO_POSITIONS) if rng.random() < .08 else rng.choice(POSITIONS),
+        'age': rng.randint(20, 37), 'g': rng.randint(60, 82) if star else rng.randint(1, 82),
+        'mp': rng.uniform(32, 38) if star else rng.uniform(6, 34),
+        '3P': fg3, '3PA': fg3a, '2P': fg2, '2PA': fg2a, 'FG': fg3 + fg2, 'FGA': fga, 'FT': ft, 'FTA': fta, 'ORB': orb, 'DRB': drb,
+        'TRB': orb + drb, 'AST': rng.uniform(1, 10), 'STL': rng.uniform(.3, 2), 'BLK': rng.uniform(.1, 2.5), 'TOV': rng.uniform(.8, 4),
+        'PF': rng.uniform(1.5, 5), 'PTS': 2 * fg2 + 3 * fg3 + ft,
+    }
+
+def stints(rng: random.Random, teams: list[str], player: dict) -> list[tuple]:
+    """
+    Returns the (team, games) rows of a player, traded players get a TOT row first
+    """
+    if player['g'] < 20 or rng.random() >= .08:
+        return [(rng.choice(teams), player['g'])]
+    first = rng.randint(5, player['g'] - 5)
+    a, b = rng.sample(teams, 2)
+    return [('TOT', player['g']), (a, first), (b, player['g'] - first)]
+
+def rates(player: dict, scale: float) -> dict:
+    return {stat: player[stat] * scale for stat in PER_36_STATS}
+
+def shooting_cells(values: dict, digits: int) -> dict:
+    fmt = (lambda value: str(int(round(value)))) if digits == 0 else (lambda value: f'{value:.{digits}f}')
+    cells = {stat: fmt(values[stat]) for stat in PER_36_STATS}
+    cells.update({'FG%': pct(values['FG'], values['FGA']), '3P%': pct(values['3P'], values['3PA']),
+                  '2P%': pct(values['2P'], values['2PA']), 'FT%': pct(values['FT'], values['FTA']),
+                  'eFG%': pct(values['FG'] + .5 * values['3P'], values['FGA'])})
+    return cells
+
+def stat_rows(rng: random.Random, stat_type: str, player: dict, team: str, games: int) -> dict:
+    """
+    Returns the cells of one row of a stat type page by column name
+    """
+    minutes = player['mp'] * games
+    cells = {'Player': player['name'], 'Pos': player['pos'], 'Age': str(player['age']), 'Tm': team, 'G': str(games),
+             'GS': str(min(games, int(games * player['mp'] / 38)))}
+    if stat_type == 'per_game':
+        cells.update(shooting_cells(rates(player, player['mp'] / 36), 1), MP=f"{player['mp']:.1f}")
+    elif stat_type == 'totals':
+        cells.update(shooting_cells(rates(player, minutes / 36), 0), MP=str(int(minutes)))
+    elif stat_type == 'per_minute':
+        cells.update(shooting_cells(rates(player, 1.), 1), MP=str(int(minutes)))
+    elif stat_type == 'per_poss':
+        cells.update(shooting_cells(rates(player, 100 / 72), 1), MP=str(int(minutes)))
+        cells.update(ORtg=str(rng.randint(95, 130)), DRtg=str(rng.randint(100, 120)))
+    elif stat_type == 'advanced':
+        ts = player['PTS'] / (2 * (player['FGA'] + .44 * player['FTA']))
+        ws = rng.uniform(-1, 14) * minutes / 3000
+        bpm = rng.uniform(-6, 10)
+        cells.update({'MP': str(int(minutes)), 'PER': f'{rng.uniform(5, 32):.1f}', 'TS%': f'{ts:.3f}'.lstrip('0'),
+                      '3PAr': pct(player['3PA'], player['FGA']), 'FTr': pct(player['FTA'], player['FGA']),
+                      'ORB%': f"{player['ORB'] * 2.5:.1f}", 'DRB%': f"{player['DRB'] * 2.5:.1f}", 'TRB%': f"{player['TRB'] * 1.5:.1f}",
+                      'AST%': f"{player['AST'] * 3.5:.1f}", 'STL%': f"{player['STL']:.1f}", 'BLK%': f"{player['BLK'] * 1.5:.1f}",
+                      'TOV%': f'{rng.uniform(6, 18):.1f}', 'USG%': f"{player['FGA'] * 1.2:.1f}", 'OWS': f'{ws * .6:.1f}',
+                      'DWS': f'{ws * .4:.1f}', 'WS': f'{ws:.1f}', 'WS/48': f'{ws * 48 / max(minutes, 1):.3f}',
+                      'OBPM': f'{bpm * .6:.1f}', 'DBPM': f'{bpm * .4:.1f}', 'BPM': f'{bpm:.1f}', 'VORP': f'{(bpm + 2) * minutes / 2500:.1f}'})
+    elif stat_type == 'play-by-play':
+        shares = [rng.random() for _ in POSITIONS]
+        shares[POSITIONS.index(player['pos'].split('-')[0])] += 3
+        cells.update({'MP': str(int(minutes)), 'OnCourt': f'{rng.uniform(-12, 12):+.1f}', 'On-Off': f'{rng.uniform(-15, 15):+.1f}'})
+        cells.update({f'{pos}%': f'{round(100 * share / sum(shares))}%' for pos, share in zip(POSITIONS, shares)})
+        cells.update({column: str(rng.randint(0, 90)) for column in ['BadPass', 'LostBall', 'Shoot', 'Off.', 'PGA', 'And1', 'Blkd']})
+    return cells
+
+def row(rank: int, columns: list[str], cells: dict) -> str:
+    tds = []
+    for column in columns[1:]:
+        value = escape(cells.get(column, ''))
+        if column == 'Player':
+            tds.append(f'<td data-stat="player"><a href="/players/x.html">{value}</a></td>')
+        else:
+            tds.append(f'<td>{value}</td>')
+    return f'<tr><th>{rank}</th>{"".join(tds)}</tr>'
+
+def header(columns: list[str], css: str = '') -> str:
+    return f'<tr{css}>' + ''.join(f'<th>{escape(column)}</th>' for column in columns) + '</tr>'
+
+def over_header(groups: list[tuple]) -> str:
+    return '<tr class="over_header">' + ''.join(f'<th colspan="{span}">{escape(name)}</th>' for name, span in groups) + '</tr>'
+
+def page(title: str, table: str) -> str:
+    return f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{escape(title)}</title></head><body>\n{table}\n</body></html>\n'
+
+def stats_page(rng: random.Random, season: int, stat_type: str, roster: list[tuple]) -> str:
+    columns = COLUMNS[stat_type]
+    rows = []
+    for rank, (player, player_stints) in enumerate(roster, 1):
+        if rank > 1 and (rank - 1) % HEADER_EVERY == 0:
+            rows.append(header(columns, ' class="thead"'))
+        rows.extend(row(rank, columns, stat_rows(rng, stat_type, player, team, games)) for team, games in player_stints)
+    thead = (over_header(PLAY_BY_PLAY_GROUPS) if stat_type == 'play-by-play' else '') + header(columns)
+    table = f'<table id="{TABLE_IDS[stat_type]}"><thead>{thead}</thead><tbody>\n' + '\n'.join(rows) + '\n</tbody></table>'
+    return page(f'{season} NBA Player Stats: {stat_type}', table)
+
+def awards_page(rng: random.Random, season: int, roster: list[tuple]) -> str:
+    rows = []
+    candidates = roster[:len(STARS.get(season, [])) or 10]
+    points = sorted((rng.randint(10, 1000) for _ in candidates), reverse=True)
+    for rank, ((player, player_stints), won) in enumerate(zip(candidates, points), 1):
+        per_game = rates(player, player['mp'] / 36)
+        # The awards page lists players without the Hall of Fame mark of the stats pages
+        cells = [str(rank), player['name'].rstrip('*'), str(player['age']), player_stints[0][0], str(rng.randint(0, 60)), str(won),
+                 '1010', f'{won / 1010:.3f}', str(player['g']), f"{player['mp']:.1f}", f"{per_game['PTS']:.1f}",
+                 f"{per_game['TRB']:.1f}", f"{per_game['AST']:.1f}", f"{per_game['STL']:.1f}", f"{per_game['BLK']:.1f}",
+                 pct(player['FG'], player['FGA']), pct(player['3P'], player['3PA']), pct(player['FT'], player['FTA']),
+                 f'{rng.uniform(8, 18):.1f}', f'{rng.uniform(.15, .3):.3f}']
+        rows.append('<tr>' + ''.join(f'<td>{escape(cell)}</td>' for cell in cells) + '</tr>')
+    table = f'<table id="mvp"><thead>{over_header(MVP_GROUPS)}{header(MVP_COLUMNS)}</thead><tbody>\n' + '\n'.join(rows) + \
+            '\n</tbody></table>'
+    return page(f'{season} NBA Awards Voting', table)
+
+def write(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write(text)
+
+def make_fixtures(output: str, seasons: list[int], players: int) -> list[str]:
+    """
+    Writes the pages of every season into output, returns their paths
+    """
+    paths = []
+    for season in seasons:
+        rng = random.Random(season)
+        stars = set(STARS.get(season, []))
+        roster = []
+        for name in names(rng, season, players):
+            player = profile(rng, season, name, name in stars)
+            roster.append((player, stints(rng, TEAMS.get(season, TEAMS[2022]), player)))
+        for stat_type in COLUMNS:
+            if stat_type == 'play-by-play' and season < FIRST_PLAY_BY_PLAY_SEASON:
+                continue
+            path = os.path.join(output, 'leagues', f'NBA_{season}_{stat_type}.html')
+            write(path, stats_page(rng, season, stat_type, roster))
+            paths.append(path)
+        path = os.path.join(output, 'awards', f'awards_{season}.html')
+        write(path, awards_page(rng, season, roster))
+        paths.append(path)
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--seasons', default=','.join(map(str, DEFAULT_SEASONS)), help="comma separated seasons, e.g. '1990,2022'")
+    parser.add_argument('--players', type=int, default=DEFAULT_PLAYERS, help='players per season')
+    args = parser.parse_args()
+
+    paths = make_fixtures(args.output, [int(season) for season in args.seasons.split(',')], args.players)
+    print(f'{len(paths)} pages written to {args.output}')
+
+if __name__ == '__main__':
+    main()
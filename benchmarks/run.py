@@ -0,0 +1,128 @@
+"""
+Benchmark suite for the data and plotting hot paths, run offline against recorded basketball reference pages
+
+    python benchmarks/run.py --season 2022
+    python benchmarks/run.py --season 2022 --save benchmarks/baseline.json
+    python benchmarks/run.py --season 2022 --compare benchmarks/baseline.json
+
+The fixtures directory is laid out like the website, e.g. benchmarks/fixtures/leagues/NBA_2022_per_game.html, the default one is
+committed and regenerated by benchmarks/make_fixtures.py. Every case reports its best and median wall time, the peak traced memory
+and the number of memory blocks still allocated after a call, i.e. what it retains, not how many allocations it made.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_FIXTURES = os.path.join(ROOT, 'benchmarks', 'fixtures')
+
+def measure(func, repeat: int) -> dict:
+    func()  # warm up imports and caches outside of the measurement
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    func()
+    after = tracemalloc.take_snapshot()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    retained = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+    return {'best_ms': min(times) * 1e3, 'median_ms': statistics.median(times) * 1e3, 'peak_kib': peak / 1024, 'retained_blocks': retained}
+
+def cases(season: int, fixtures: str) -> dict:
+    """
+    Returns the benchmark cases by name, tables are loaded from the fixtures into a temporary warehouse
+    """
+    from nbanalyzer import basketball_reference_api as api
+    from nbanalyzer import data_visualization as viz
+    from nbanalyzer import query
+    from nbanalyzer.html_parser import TABLE_IDS
+
+    benchmarks = {}
+    for stat_type in TABLE_IDS:
+        path = os.path.join(fixtures, 'leagues', f'NBA_{season}_{stat_type}.html')
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding='utf-8') as f:
+            page = f.read()
+        header = api.stat_type_header(stat_type)
+        benchmarks[f'parse/{stat_type}'] = lambda page=page, header=header, stat_type=stat_type: \
+            api.parse_players_data(page, header, stat_type=stat_type)
+
+    player_ids = list(api.get_advanced_metrics(season).index[:50])
+    benchmarks['advanced_metrics'] = lambda: api.compute_advanced_metrics(season)
+    benchmarks['percentiles/build'] = lambda: api.build_percentile_index(api.get_advanced_metrics(season), api.ADVANCED_BOX_SCORE_COLS[3:])
+    benchmarks['percentiles/lookup_50'] = lambda: api.get_player_percentiles(season, player_ids)
+    index = query.get_table_index(season, 'per_game')
+    sidebar = query.compile_query(teams=index.teams[1:], positions=['C', 'PF', 'SF', 'PG', 'SG'], min_games=20, name_prefix='j')
+    benchmarks['query/sidebar'] = lambda: sidebar.run(index)
+    best_players = ['Nikola Jokić', 'Joel Embiid']
+    # __wrapped__ skips the figure cache so every run builds the figure
+    benchmarks['plot/scoring'] = lambda: viz.gen_scoring_efficiency_plot.__wrapped__(season, best_players)
+    benchmarks['plot/shooting'] = lambda: viz.gen_shooting_efficiency_plot.__wrapped__(season)
+    benchmarks['plot/playmaking'] = lambda: viz.gen_playmaking_plot.__wrapped__(season)
+    benchmarks['plot/heatmap'] = lambda: viz.draw_intercorrelation_heatmap.__wrapped__(season)
+    if os.path.exists(os.path.join(fixtures, 'leagues', f'NBA_{season}_play-by-play.html')):
+        benchmarks['plot/on_off'] = lambda: viz.gen_on_off_plot.__wrapped__(season, best_players)
+    return benchmarks
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Returns the cases whose best time or peak memory grew more than threshold times over the baseline
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for metric in ('best_ms', 'peak_kib'):
+            ratio = result[metric] / max(baseline[name][metric], 1e-9)
+            if ratio > threshold:
+                regressions.append(f'{name} {metric}: {baseline[name][metric]:.1f} -> {result[metric]:.1f} ({ratio:.2f}x)')
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES)
+    parser.add_argument('--season', type=int, default=2022)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--filter', default='', help='only run cases whose name contains this text')
+    parser.add_argument('--save', help='write the results to this json file')
+    parser.add_argument('--compare', help='baseline json file to compare the results with')
+    parser.add_argument('--threshold', type=float, default=1.25, help='slowdown ratio reported as a regression')
+    args = parser.parse_args()
+
+    # Pages are read from the fixtures into a throwaway warehouse, nothing touches the network or the real warehouse
+    os.environ['NBANALYZER_BASE_URL'] = os.path.join(os.path.abspath(args.fixtures), '')
+    os.environ['NBANALYZER_WAREHOUSE'] = tempfile.mkdtemp(prefix='nbanalyzer-bench-')
+    sys.path.insert(0, ROOT)
+
+    results = {}
+    print(f'{"case":<24}{"best ms":>10}{"median ms":>11}{"peak KiB":>10}{"retained blocks":>17}')
+    for name, func in cases(args.season, args.fixtures).items():
+        if args.filter not in name:
+            continue
+        results[name] = measure(func, args.repeat)
+        result = results[name]
+        print(f'{name:<24}{result["best_ms"]:>10.2f}{result["median_ms"]:>11.2f}{result["peak_kib"]:>10.0f}{result["retained_blocks"]:>17}')
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
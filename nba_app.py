@@ -1,7 +1,10 @@
 import streamlit as st
-import base64
 import os
 from nbanalyzer import *
+from nbanalyzer.prefetch import prefetch_season, SEASON_STAT_TYPES
+from nbanalyzer.export import EXPORT_FORMATS, export_table, export_file_name
+from nbanalyzer.instrumentation import configure_from_env
+from nbanalyzer.query import compile_query, get_table_index
 from PIL import Image
 import time
 
@@ -10,19 +13,32 @@ PROGRESS_BAR_CUSTOM_COLOR = '#f63366'
 
 ordinal = lambda n: "%d%s" % (n,"tsnrhtdd"[(n//10%10!=1)*(n%10<4)*n%10::4])
 
-def load_data(year: int, stat_type: str):
-    if stat_type == 'play-by-play':
-        return get_players_data(year, stat_type, 1)
-    elif stat_type == 'advanced_box_score':
-        return get_advanced_metrics(year)
-
-    return get_players_data(year, stat_type, 0)
-
-def filedownload(df):
-    csv = df.to_csv(index=False)
-    b64 = base64.b64encode(csv.encode()).decode()  # strings <-> bytes conversions
-    href = f'<a href="data:file/csv;base64,{b64}" download="playerstats.csv">Download CSV File</a>'
-    return href
+def get_best_players(year: int):
+    if year < 2022:
+        return get_mvp_voting(year, 5)
+    return ['Nikola Jokić', 'Joel Embiid', 'Chris Paul', 'Stephen Curry', 'Kevin Durant', 'Giannis Antetokounmpo',
+        'Ja Morant', 'Luka Dončić', 'Devin Booker', 'DeMar DeRozan', 'Jimmy Butler']
+
+def show_section(name: str) -> bool:
+    # Expanders run their content even when collapsed and on every rerun, so each section is deliberately behind a checkbox
+    # and only loads its data once asked to
+    return st.checkbox(f'Show {name}', key=f'show {name}')
+
+def prefetch_once(year: int):
+    # Tables are prefetched once per season and session, not on every rerun
+    prefetched = st.session_state.setdefault('prefetched seasons', set())
+    if year not in prefetched:
+        prefetched.add(year)
+        prefetch_season(year, published_stat_types(year, SEASON_STAT_TYPES), mvp=year < 2022)
+
+def filedownload(df, name: str):
+    # The file is only encoded once asked for, not on every rerun
+    export_format = st.selectbox('Export format', list(EXPORT_FORMATS), format_func=str.upper)
+    if st.button('Prepare download'):
+        with st.spinner('Exporting...'):
+            data = export_table(df, export_format)
+        st.download_button(f'Download {export_format.upper()} File', data, export_file_name(name, export_format),
+            EXPORT_FORMATS[export_format].mime)
 
 def translate_stat_type(stat_type):
     if stat_type == 'per_game':
@@ -42,7 +58,7 @@ def translate_stat_type(stat_type):
     return 'None'
 
 def main():    
-    st.set_option('deprecation.showPyplotGlobalUse', False)
+    configure_from_env()
     icon = Image.open(os.path.join(script_directory, 'favicon.ico'))
     st.set_page_config('NBA Stats Explorer', icon)
 
@@ -52,37 +68,44 @@ def main():
 
     st.markdown("""
       This app performs simple webscraping of NBA player stats data!
-    * **Python libraries:** base64, matplotlib, pandas, plotly, streamlit
+    * **Python libraries:** matplotlib, pandas, plotly, pyarrow, streamlit
     * **Data source:** [Basketball-reference.com](https://www.basketball-reference.com/).
     """)
 
     st.sidebar.header('User Input Features')
     selected_year = st.sidebar.selectbox('Year', list(reversed(range(1977,2023))))
     selected_stat = st.sidebar.selectbox('Player Stats', STAT_TYPES, format_func=translate_stat_type)
-    playerstats = load_data(selected_year, selected_stat)
-    
+    # Teams, positions and sorted names are indexed once per table, filters only combine the prebuilt indexes
+    playerstats = get_table_index(selected_year, selected_stat)
 
     # Sidebar - Team selection
-    sorted_unique_team = sorted(playerstats.Tm.unique())
-    selected_team = st.sidebar.multiselect('Team', sorted_unique_team, sorted_unique_team)
+    selected_team = st.sidebar.multiselect('Team', playerstats.teams, playerstats.teams)
 
     # Sidebar - Position selection
     unique_pos = ['C','PF','SF','PG','SG']
     selected_pos = st.sidebar.multiselect('Position', unique_pos, unique_pos)
 
+    # Sidebar - Player name and minimum games and minutes, where the table has them
+    name_prefix = st.sidebar.text_input('Player name starts with')
+    min_games = 0
+    if 'G' in playerstats.columns:
+        min_games = st.sidebar.slider('Minimum games', 0, int(playerstats.table['G'].max()), 0)
+    min_minutes = 0
+    if 'MP' in playerstats.columns:
+        min_minutes = st.sidebar.slider('Minimum minutes', 0, int(playerstats.table['MP'].max()), 0)
+
     # Filtering data
-    df_selected_team = playerstats[(playerstats.Tm.isin(selected_team)) & (playerstats.Pos.isin(selected_pos))]
+    query = compile_query(teams=selected_team, positions=selected_pos, min_games=min_games, min_minutes=min_minutes,
+        name_prefix=name_prefix)
+    df_selected_team = query.run(playerstats)
 
     st.header('Displaying Players\' ' + translate_stat_type(selected_stat) + ' Stats of Selected Team(s)')
     st.write('Data Dimension: ' + str(df_selected_team.shape[0]) + ' rows and ' + str(df_selected_team.shape[1]) + ' columns.')
     st.dataframe(df_selected_team)
-    st.markdown(filedownload(df_selected_team), unsafe_allow_html=True)
+    filedownload(df_selected_team, f'playerstats_{selected_year}_{selected_stat}')
 
-    if selected_year < 2022:
-        best_players = get_mvp_voting(selected_year, 5)
-    else:
-        best_players = ['Nikola Jokić', 'Joel Embiid', 'Chris Paul', 'Stephen Curry', 'Kevin Durant', 'Giannis Antetokounmpo',
-            'Ja Morant', 'Luka Dončić', 'Devin Booker', 'DeMar DeRozan', 'Jimmy Butler']
+    # The other tables of the season download concurrently while the sections below are collapsed
+    prefetch_once(selected_year)
     
     with st.spinner('Loading season summary...'):
         st.header(f'{selected_year} Season Summary')
@@ -93,11 +116,13 @@ def main():
 
         if selected_year < 2022:
             with st.expander(f'{selected_year} NBA MVP'):
-                st.write(f"""
-                    ### MVP
-                    This season's MVP was **{best_players[0]}** who won the prize against the likes of {best_players[1]}, {best_players[2]}
-                    and {best_players[3]}.
-                """)
+                if show_section('MVP'):
+                    best_players = get_best_players(selected_year)
+                    st.write(f"""
+                        ### MVP
+                        This season's MVP was **{best_players[0]}** who won the prize against the likes of {best_players[1]}, {best_players[2]}
+                        and {best_players[3]}.
+                    """)
 
         with st.expander(f'Intercorrelation Matrix Heatmap - {selected_year}'):
             st.markdown("""
@@ -105,18 +130,20 @@ def main():
                 The matrix is calculated from a cross-tabulation and shows how statistically similar all pairs of variables are in their 
                 distributions across the various samples. The table below shows the intercorrelations between per game player stats.
             """)
-            with st.spinner('Loading heatmap...'):
-                draw_intercorrelation_heatmap(selected_year)
-                st.pyplot()
+            if show_section('heatmap'):
+                with st.spinner('Loading heatmap...'):
+                    st.image(draw_intercorrelation_heatmap(selected_year))
 
         with st.expander(f'Scoring - {selected_year}'):
             st.markdown("""
                 ### Points per 75 possessions x TS% Scatter Plot
                 The scatter plot is used to analyze the relation between \"inflation adjusted\" scoring and efficiency from players across the league.
             """)
-            with st.spinner('Loading scatter plot'):                       
-                st.write(gen_scoring_efficiency_plot(selected_year, best_players))
+            if show_section('scoring plot'):
+                with st.spinner('Loading scatter plot'):                       
+                    st.write(gen_scoring_efficiency_plot(selected_year, get_best_players(selected_year)))
 
+        selected_player = None
         if selected_year >= 1980:
             with st.expander(f'Shooting - {selected_year}'):
                 st.markdown("""
@@ -124,8 +151,9 @@ def main():
                     The scatter plot is used to analyze the relation between 3-Point Field Goal attempts per 100 possessions and 3-Point Field Goal 
                     Percentage from players across the league as well as observe the evolution of shooting along the decades.
                 """)
-                with st.spinner('Loading scatter plot'):                       
-                    st.write(gen_shooting_efficiency_plot(selected_year))
+                if show_section('shooting plot'):
+                    with st.spinner('Loading scatter plot'):                       
+                        st.write(gen_shooting_efficiency_plot(selected_year))
 
             with st.expander(f'Playmaking - {selected_year}'):
                 st.markdown("""
@@ -133,8 +161,9 @@ def main():
                     The scatter plot is used to analyze the relation between a per 100 estimate of the number of true shots created for teammates and 
                     the percentage of possessions a player is directly or indirectly involved in a true shooting attempt, or commits a turnover.
                 """)
-                with st.spinner('Loading scatter plot'):                       
-                    st.write(gen_playmaking_plot(selected_year))
+                if show_section('playmaking plot'):
+                    with st.spinner('Loading scatter plot'):                       
+                        st.write(gen_playmaking_plot(selected_year))
             
             with st.expander('Player Finder'):
                 st.markdown("""
@@ -149,26 +178,34 @@ def main():
                     }}
                     </style>
                 """, unsafe_allow_html=True)
-                advanced_box_score = get_advanced_metrics(selected_year)
-                selected_player = st.selectbox('Player Name', advanced_box_score['Player'])
-                
-                showed_name = False
-                
-                if selected_player != '':
-                    with st.spinner('Loading player summary'):
-                        for stat in ADVANCED_BOX_SCORE_COLS[3:]:
-                            result = get_player_percentile_from_advanced_stat(advanced_box_score, selected_player, stat)
-                            if result.empty:
-                                break
-                            if not showed_name:
-                                player_name = result.iloc[0]['Player']
-                                st.markdown(f'#### {player_name} {selected_year} Summary')
-                                showed_name = True
-                            player_stat = int(result.iloc[0][stat] * 100)
-                            st.markdown(f'{stat} - {ordinal(player_stat)} Percentile')
-                            st.progress(player_stat)
-
-        if selected_year >= 1997:
+                if show_section('Player Finder'):
+                    advanced_box_score = get_advanced_metrics(selected_year)
+                    selected_player = st.selectbox('Player Name', advanced_box_score.index,
+                        format_func=lambda player_id: advanced_box_score.at[player_id, 'Player'])
+                    
+                    if selected_player:
+                        with st.spinner('Loading player summary'):
+                            profile = get_player_percentiles(selected_year, [selected_player])
+                            if not profile.empty:
+                                st.markdown(f'#### {advanced_box_score.at[selected_player, "Player"]} {selected_year} Summary')
+                                for stat in ADVANCED_BOX_SCORE_COLS[3:]:
+                                    player_stat = int(profile.iloc[0][stat] * 100)
+                                    st.markdown(f'{stat} - {ordinal(player_stat)} Percentile')
+                                    st.progress(player_stat)
+
+            with st.expander('Similar Players'):
+                st.markdown("""
+                    ### Similar Players
+                    Finds the player seasons closest to the player selected in the Player Finder across every season in the range. Players are 
+                    compared by their advanced box score metrics and per 100 possessions stats relative to the league of their own season.
+                """)
+                first_season, last_season = st.slider('Seasons', 1980, 2022, (1980, 2022))
+                if selected_player and st.button('Find similar players'):
+                    with st.spinner('Searching player seasons'):
+                        index = get_similarity_index(min(first_season, selected_year), max(last_season, selected_year))
+                        st.dataframe(index.similar_players(selected_year, selected_player, 10))
+
+        if selected_year >= FIRST_PLAY_BY_PLAY_SEASON:
             with st.expander(f'Impact - {selected_year}'):
                 st.markdown("""
                     ### Impact metrics
@@ -177,7 +214,31 @@ def main():
                     * **OnCourt**: Plus/Minus Per 100 Possessions (On Court only).
                     * **BPM**: A box score estimate of the points per 100 possessions a player contributed above a league-average player, translated to an average team.
                 """)                
-                st.write(gen_on_off_plot(selected_year, best_players))
+                if show_section('impact plot'):
+                    st.write(gen_on_off_plot(selected_year, get_best_players(selected_year)))
+
+    st.header('League History')
+    with st.expander('League History'):
+        st.markdown("""
+            ### League History
+            Trends across every season in the range, computed one season at a time from the local data warehouse. Seasons missing from 
+            the warehouse are downloaded on first use, run the ingest beforehand to explore the whole history quickly.
+        """)
+        first_season, last_season = st.slider('History seasons', 1980, 2022, (1980, 2022))
+        if show_section('3-point trends'):
+            by = st.radio('Trends by', ['season', 'era'], format_func=str.capitalize)
+            with st.spinner('Loading 3-point trends'):
+                st.write(gen_shooting_trends_plot(last_season, first_season, by))
+
+        if show_section('season leaders'):
+            metric = st.selectbox('Metric', ADVANCED_BOX_SCORE_COLS[3:])
+            with st.spinner('Loading season leaders'):
+                st.write(gen_season_leaders_plot(last_season, first_season, metric, 10))
+
+        if show_section('era correlations'):
+            selected_era = st.selectbox('Era', sorted({era(season) for season in range(first_season, last_season + 1)}))
+            with st.spinner('Loading era heatmap'):
+                st.image(draw_era_correlation_heatmap(last_season, first_season, selected_era))
 
 if __name__ == '__main__':
     main()
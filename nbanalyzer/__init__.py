@@ -1,2 +1,5 @@
 from .basketball_reference_api import *
-from .data_visualization import *
\ No newline at end of file
+from .metrics import *
+from .data_visualization import *
+from .similarity import *
+from .history import *
\ No newline at end of file
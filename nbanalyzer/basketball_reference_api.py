@@ -1,20 +1,109 @@
+from io import StringIO
 from math import exp
-from os import remove
+from os import remove, environ
 import pandas as pd
-from streamlit import cache
+from .caching import cache
+from . import warehouse
+from .fetch import fetch_page
+from .html_parser import TABLE_IDS, SCHEMAS, parse_stats_table
+from .metrics import advanced_metrics_table
+from .players import index_by_player, build_player_index
+from .compact import compact_frame, primary_positions
+from .views import freeze, shallow
+from .percentiles import build_percentile_index, lookup_percentiles
+from .instrumentation import logger, span, size
 
-BASE_URL = 'https://www.basketball-reference.com/'
+# May point to a local directory of saved pages to read them offline
+BASE_URL = environ.get('NBANALYZER_BASE_URL', 'https://www.basketball-reference.com/')
 STAT_TYPES = ['per_game', 'totals', 'per_minute', 'advanced', 'per_poss', 'play-by-play', 'advanced_box_score']
 ADVANCED_BOX_SCORE_COLS = ['Player','Pos','Tm','Scoring Rate','Efficiency(TS%)','Spacing','Creation','Offensive Load']
+# Play-by-play pages are only published from this season on
+FIRST_PLAY_BY_PLAY_SEASON = 1997
+# Columns of each stat type the advanced box score metrics are computed from
+ADVANCED_METRIC_INPUTS = {'per_poss': ['PTS', '3PA', '3P%', 'AST', 'TOV', 'FGA', 'FTA'], 'advanced': ['TS%']}
+
+def published_stat_types(season: int, stat_types: list[str]) -> list[str]:
+    """
+    Returns the stat types of stat_types whose page exists for a season
+    """
+    return [stat_type for stat_type in stat_types if stat_type != 'play-by-play' or season >= FIRST_PLAY_BY_PLAY_SEASON]
 
-@cache
 def get_players_data(season: int, stat_type: str, header: int = 0, filter_games=True, remove_duplicates=True) -> pd.DataFrame:
     """
     Returns a dataframe representing player data from the season and stat type selected web scrapping basketball reference website
     """
-    url = f'{BASE_URL}leagues/NBA_{str(season)}_{stat_type}.html'
-    print(f'GET {url}')
-    html = pd.read_html(url, header = header)
+    return shallow(_get_players_data(season, stat_type, header, filter_games, remove_duplicates, warehouse.season_version(season)))
+
+# Cached frames are frozen, so streamlit does not need to hash them on every call to detect mutations, and callers get shallow
+# copies of them, so added, replaced or dropped columns and rows do not reach the cache either.
+# The season version is part of the cache key, tables changed by a refresh are loaded again.
+@cache(allow_output_mutation=True)
+def _get_players_data(season: int, stat_type: str, header: int, filter_games: bool, remove_duplicates: bool, version: int) -> pd.DataFrame:
+    return load_players_data(season, stat_type, header, filter_games, remove_duplicates)
+
+def load_players_data(season: int, stat_type: str, header: int = 0, filter_games=True, remove_duplicates=True) -> pd.DataFrame:
+    """
+    Uncached get_players_data, safe to call from worker threads. Concurrent loads of the same table wait for a single download.
+    """
+    params = dict(header=header, filter_games=filter_games, remove_duplicates=remove_duplicates)
+    with warehouse.table_lock(season, stat_type, **params):
+        player_stats = warehouse.load_table(season, stat_type, **params)
+        if player_stats is None:
+            url = players_data_url(season, stat_type)
+            logger.info('GET %s', url)
+            player_stats = parse_players_data(fetch_page(url), header, filter_games, remove_duplicates, stat_type)
+            warehouse.store_table(season, stat_type, player_stats, **params)
+            return freeze(player_stats)
+    # Tables read back from disk get their own dictionaries, they are moved to the shared ones
+    return freeze(compact_frame(player_stats)[0])
+
+def players_data_url(season: int, stat_type: str, base_url: str = None) -> str:
+    return f'{base_url or BASE_URL}leagues/NBA_{str(season)}_{stat_type}.html'
+
+def mvp_voting_url(season: int, base_url: str = None) -> str:
+    return f'{base_url or BASE_URL}awards/awards_{str(season)}.html'
+
+def parse_players_data(page: str, header: int = 0, filter_games=True, remove_duplicates=True, stat_type: str = None) -> pd.DataFrame:
+    """
+    Returns a dataframe representing player data from the html of a basketball reference stats page
+    """
+    with span('parse', stat_type=stat_type):
+        player_stats = None
+        if stat_type in TABLE_IDS:
+            player_stats = parse_stats_table(page, TABLE_IDS[stat_type], header, SCHEMAS[stat_type])
+        if player_stats is None:
+            player_stats = read_html_players_data(page, header)
+
+    with span('clean', stat_type=stat_type):
+        # Ids are given on the whole page so players sharing a name keep the same id in filtered and unfiltered tables
+        player_stats = index_by_player(player_stats)
+        if filter_games:
+            max_games_played = player_stats['G'].max()
+            threshold = max_games_played // 2   
+            player_stats = player_stats[player_stats['G'] >= threshold]
+
+    with span('dedup', stat_type=stat_type):
+        if remove_duplicates:
+            player_stats = player_stats[~player_stats.index.duplicated()]
+            player_stats['Pos'] = primary_positions(player_stats['Pos'])
+        
+    return compact(player_stats)
+
+def compact(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns df with compact dtypes and reports the memory saved
+    """
+    with span('compact'):
+        df, saved = compact_frame(df)
+    size('compact_saved', saved)
+    logger.debug('COMPACT %d rows, saved %d bytes', len(df), saved)
+    return df
+
+def read_html_players_data(page: str, header: int = 0) -> pd.DataFrame:
+    """
+    Parses the first table of a stats page with pandas.read_html, used for pages whose table id is not known
+    """
+    html = pd.read_html(StringIO(page), header = header)
     df = html[0]
 
     raw = None
@@ -30,47 +119,128 @@ def get_players_data(season: int, stat_type: str, header: int = 0, filter_games=
             player_stats[col]=pd.to_numeric(player_stats[col])
         except ValueError:
             player_stats[col]=player_stats[col]
-    
-    if filter_games:
-        max_games_played = player_stats['G'].max()
-        threshold = max_games_played // 2   
-        player_stats = player_stats[player_stats['G'] >= threshold]
-
-    if remove_duplicates:
-        player_stats.drop_duplicates(subset=['Player'], inplace=True)
-        player_stats['Pos'].replace(['SG-PG','SG-SF','SG-PF','SG-C'], 'SG', inplace=True)        
-        player_stats['Pos'].replace(['PG-SG','PG-SF','PG-PF','PG-C'], 'PG', inplace=True)
-        player_stats['Pos'].replace(['SF-PG','SF-SG','SF-PF','SF-C'], 'SF', inplace=True)
-        player_stats['Pos'].replace(['PF-PG','PF-SF','PF-SF','PF-C'], 'PF', inplace=True)
-        player_stats['Pos'].replace(['C-PG','C-SF','C-PF','C-SG'], 'C', inplace=True)        
-        
     return player_stats
 
+def stat_type_header(stat_type: str) -> int:
+    """
+    Returns the header row of a stat type table, the play-by-play table has an extra header row
+    """
+    return 1 if stat_type == 'play-by-play' else 0
+
+def get_player_index(season: int) -> pd.DataFrame:
+    """
+    Returns the canonical players of a season indexed by PlayerID
+    """
+    return shallow(_get_player_index(season, warehouse.season_version(season)))
+
+@cache(allow_output_mutation=True)
+def _get_player_index(season: int, version: int) -> pd.DataFrame:
+    players = warehouse.load_table(season, 'players')
+    if players is None:
+        players = build_player_index(get_players_data(season, 'per_game'), season)
+        warehouse.store_table(season, 'players', players)
+        return freeze(players)
+    return freeze(compact_frame(players)[0])
+
+def join_stat_types(season: int, columns: dict) -> pd.DataFrame:
+    """
+    Returns the canonical players of a season joined on PlayerID with the selected columns of each stat type,
+    e.g. {'per_poss': ['PTS'], 'advanced': ['TS%']}. Columns repeated across stat types are suffixed with the stat type.
+    """
+    tables = {stat_type: get_players_data(season, stat_type, stat_type_header(stat_type)) for stat_type in columns}
+    return join_tables(get_player_index(season), tables, columns)
+
+def join_tables(players: pd.DataFrame, tables: dict, columns: dict) -> pd.DataFrame:
+    """
+    Joins the selected columns of {stat_type: table} tables on the PlayerID index of players
+    """
+    joined = players
+    for stat_type, cols in columns.items():
+        joined = joined.join(tables[stat_type][cols], how='inner', rsuffix=f' ({stat_type})')
+    return joined
+
 @cache
 def get_mvp_voting(season: int, top=10) -> list:
     """
     Returns top mvp candidates from season
     """
-    url = f'{BASE_URL}awards/awards_{str(season)}.html#mvp'
-    html = pd.read_html(url, header = 1)
-    df = html[0]
-    player_stats = df.drop(['Rank'], axis=1)
+    player_stats = load_mvp_voting(season)
 
     if top > 0:
         return player_stats[:top]['Player']
     return list(player_stats.Player.values)
 
-@cache
+def load_mvp_voting(season: int) -> pd.DataFrame:
+    """
+    Returns the mvp voting table of a season, safe to call from worker threads
+    """
+    with warehouse.table_lock(season, 'mvp'):
+        player_stats = warehouse.load_table(season, 'mvp')
+        if player_stats is None:
+            player_stats = parse_mvp_voting(fetch_page(mvp_voting_url(season)))
+            warehouse.store_table(season, 'mvp', player_stats)
+    return player_stats
+
+def parse_mvp_voting(page: str) -> pd.DataFrame:
+    """
+    Returns the mvp voting table from the html of a basketball reference awards page
+    """
+    # The mvp table is the first one on the awards page
+    html = pd.read_html(StringIO(page), header = 1)
+    df = html[0]
+    return df.drop(['Rank'], axis=1)
+
 def get_advanced_metrics(season: int) -> pd.DataFrame:
-    per_100 = get_players_data(season, 'per_poss')
-    advanced = get_players_data(season, 'advanced')
-    per_game = get_players_data(season, 'per_game')
-    league_avg_efg = per_game['eFG%'].mean()
-
-    table = [[p,pos,tm,pts,ts,spacing(attmpts,pctg,league_avg_efg),box_creation(ast,pts,attmpts,pctg,tov),offensive_load(ast,fga,fta,tov,box_creation(ast,pts,attmpts,pctg,tov))] 
-        for p,pos,tm,pts,ts,attmpts,pctg,ast,tov,fga,fta 
-        in zip(per_100['Player'],per_100['Pos'],per_100['Tm'],per_100['PTS'],advanced['TS%'],per_100['3PA'],per_100['3P%'],per_100['AST'],per_100['TOV'],per_100['FGA'],per_100['FTA'])]
-    return pd.DataFrame(table, columns=ADVANCED_BOX_SCORE_COLS)    
+    return shallow(_get_advanced_metrics(season, warehouse.season_version(season)))
+
+@cache(allow_output_mutation=True)
+def _get_advanced_metrics(season: int, version: int) -> pd.DataFrame:
+    metrics = warehouse.load_table(season, 'advanced_box_score')
+    if metrics is None:
+        metrics = compute_advanced_metrics(season)
+        warehouse.store_table(season, 'advanced_box_score', metrics)
+        return metrics
+    return freeze(compact_frame(metrics)[0])
+
+def compute_advanced_metrics(season: int) -> pd.DataFrame:
+    """
+    Uncached get_advanced_metrics
+    """
+    per_100 = join_stat_types(season, ADVANCED_METRIC_INPUTS)
+    return freeze(advanced_metrics_from(per_100, league_average_efg(get_players_data(season, 'per_game'))))
+
+def league_average_efg(per_game: pd.DataFrame) -> float:
+    return per_game['eFG%'].mean()
+
+def advanced_metrics_from(per_100: pd.DataFrame, league_avg_efg: float) -> pd.DataFrame:
+    """
+    Returns the advanced box score metrics of the players of per_100, the ADVANCED_METRIC_INPUTS columns joined on PlayerID
+    """
+    with span('metrics', metric='advanced_box_score'):
+        metrics = advanced_metrics_table(per_100, per_100['TS%'], league_avg_efg)
+    return compact(metrics)
+
+def get_percentile_index(season: int) -> pd.DataFrame:
+    """
+    Returns the league percentiles of every advanced box score metric of a season indexed by PlayerID
+    """
+    return shallow(_get_percentile_index(season, warehouse.season_version(season)))
+
+@cache(allow_output_mutation=True)
+def _get_percentile_index(season: int, version: int) -> pd.DataFrame:
+    percentiles = warehouse.load_table(season, 'percentiles')
+    if percentiles is None:
+        advanced_box_score = get_advanced_metrics(season)
+        with span('metrics', metric='percentiles'):
+            percentiles = build_percentile_index(advanced_box_score, ADVANCED_BOX_SCORE_COLS[3:])
+        warehouse.store_table(season, 'percentiles', percentiles)
+    return freeze(percentiles)
+
+def get_player_percentiles(season: int, player_ids: list[str]) -> pd.DataFrame:
+    """
+    Returns the percentile profiles of the selected players of a season
+    """
+    return lookup_percentiles(get_percentile_index(season), player_ids)
 
 def spacing(attemps: float, percentage: float, league_avg_efg: float) -> float:
     """
@@ -0,0 +1,44 @@
+"""
+Per process memoization that does not tie the library to the Streamlit runtime. Inside a Streamlit app, which has imported
+streamlit before any call, functions go through st.cache. Elsewhere, e.g. in batch jobs, they are memoized with functools and
+streamlit is never imported. Those caches keep the CACHE_ENTRIES most recent results of each function, long lived workers going
+through many seasons read older ones back from the warehouse instead of holding every season's frames.
+"""
+import functools
+import os
+import sys
+import threading
+from typing import Callable
+
+CACHE_ENTRIES = int(os.environ.get('NBANALYZER_CACHE_ENTRIES', 32))
+
+def _streamlit_cache(st, func: Callable, kwargs: dict) -> Callable:
+    if hasattr(st, 'cache'):
+        return st.cache(func, **kwargs)
+    # Releases without st.cache: shared mutable results map to cache_resource, the others to cache_data
+    if kwargs.get('allow_output_mutation'):
+        return st.cache_resource(func)
+    return st.cache_data(func)
+
+def cache(func: Callable = None, **kwargs) -> Callable:
+    """
+    Drop-in for streamlit.cache, used as @cache or @cache(allow_output_mutation=True). The backend is chosen on the first call.
+    """
+    if func is None:
+        return lambda func: cache(func, **kwargs)
+
+    cached = None
+    lock = threading.Lock()
+
+    @functools.wraps(func)
+    def wrapper(*args, **call_kwargs):
+        nonlocal cached
+        if cached is None:
+            with lock:
+                if cached is None:
+                    if 'streamlit' in sys.modules:
+                        cached = _streamlit_cache(sys.modules['streamlit'], func, kwargs)
+                    else:
+                        cached = functools.lru_cache(maxsize=CACHE_ENTRIES)(func)
+        return cached(*args, **call_kwargs)
+    return wrapper
@@ -0,0 +1,100 @@
+"""
+Compact dtypes for cached tables, text columns become categoricals and numeric stats are downcast to the smallest safe dtype
+"""
+import threading
+import numpy as np
+import pandas as pd
+
+POSITIONS = ['PG', 'SG', 'SF', 'PF', 'C']
+# Every franchise abbreviation used since 1977, TOT rows hold the totals of traded players
+TEAMS = ['ATL', 'BOS', 'BRK', 'BUF', 'CHA', 'CHH', 'CHI', 'CHO', 'CLE', 'DAL', 'DEN', 'DET', 'GSW', 'HOU', 'IND', 'KCK', 'LAC', 'LAL',
+         'MEM', 'MIA', 'MIL', 'MIN', 'NJN', 'NOH', 'NOK', 'NOP', 'NYK', 'NYN', 'OKC', 'ORL', 'PHI', 'PHO', 'POR', 'SAC', 'SAS', 'SDC',
+         'SEA', 'TOR', 'TOT', 'UTA', 'VAN', 'WAS', 'WSB']
+LEAGUE_CATEGORIES = {'Pos': POSITIONS, 'Tm': TEAMS}
+CATEGORICAL_COLUMNS = ['Player', 'Pos', 'Tm']
+# Stats are published with at most 3 decimals
+FLOAT_DECIMALS = 3
+
+_shared_dtypes = {}
+_shared_lock = threading.Lock()
+
+def primary_positions(positions: pd.Series) -> pd.Series:
+    """
+    Maps multi position players, e.g. 'SG-PG', to their first position with a single lookup over the distinct values
+    """
+    mapping = {pos: str(pos).split('-')[0] for pos in positions.unique()}
+    return positions.map(mapping)
+
+def _shared_dtype(column: str, values) -> pd.CategoricalDtype:
+    """
+    Returns the shared dtype of a column once every value is one of its categories, missing values are appended
+    """
+    with _shared_lock:
+        dtype = _shared_dtypes.get(column) or pd.CategoricalDtype(LEAGUE_CATEGORIES.get(column, []))
+        missing = set(values) - set(dtype.categories)
+        if missing:
+            dtype = pd.CategoricalDtype(list(dtype.categories) + sorted(missing))
+        _shared_dtypes[column] = dtype
+    return dtype
+
+def categorical(values: pd.Series, column: str) -> pd.Series:
+    """
+    Returns values as a categorical whose dtype is shared by every frame of the process, so frames of a column hold codes into
+    the same league wide dictionary. New values are appended to the dictionary, existing codes never change, see recast.
+    """
+    values = values.astype(str)
+    return values.astype(_shared_dtype(column, values.unique()))
+
+def recast(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns df with its categorical columns on the current shared dtypes. A frame compacted before the dictionary of a column
+    grew keeps the older dtype, frames are recast before they are combined or compared with newer ones.
+    """
+    columns = [col for col in CATEGORICAL_COLUMNS if col in df and isinstance(df[col].dtype, pd.CategoricalDtype)]
+    stale = {col: dtype for col in columns if (dtype := _shared_dtype(col, df[col].cat.categories)) != df[col].dtype}
+    return df.astype(stale) if stale else df
+
+def concat_frames(frames, **kwargs) -> pd.DataFrame:
+    """
+    pandas.concat of compacted frames, a list or a {key: frame} mapping, keeping their categorical columns categorical
+    """
+    if isinstance(frames, dict):
+        frames = {key: recast(df) for key, df in frames.items()}
+    else:
+        frames = [recast(df) for df in frames]
+    return pd.concat(frames, **kwargs)
+
+def downcast(values: pd.Series) -> pd.Series:
+    """
+    Returns integers in the smallest integer dtype and floats as float32 when no value changes at the published precision
+    """
+    if pd.api.types.is_integer_dtype(values):
+        return pd.to_numeric(values, downcast='integer')
+    if values.dtype == np.float64:
+        narrow = values.astype(np.float32)
+        if np.array_equal(narrow.astype(np.float64).round(FLOAT_DECIMALS), values.round(FLOAT_DECIMALS), equal_nan=True):
+            return narrow
+    return values
+
+def frame_bytes(df: pd.DataFrame) -> int:
+    """
+    Returns the memory held by df alone, the shared dictionaries of categorical columns are not counted
+    """
+    total = df.index.memory_usage(deep=True)
+    for col in df.columns:
+        values = df[col]
+        total += values.cat.codes.nbytes if isinstance(values.dtype, pd.CategoricalDtype) else values.memory_usage(index=False, deep=True)
+    return int(total)
+
+def compact_frame(df: pd.DataFrame) -> tuple[pd.DataFrame, int]:
+    """
+    Returns a compacted copy of df and the number of bytes it saves
+    """
+    columns = {}
+    for col in df.columns:
+        if col in CATEGORICAL_COLUMNS:
+            columns[col] = categorical(df[col], col)
+        else:
+            columns[col] = downcast(df[col])
+    compacted = pd.DataFrame(columns, index=df.index)
+    return compacted, frame_bytes(df) - frame_bytes(compacted)
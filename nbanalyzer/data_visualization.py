@@ -1,28 +1,36 @@
+# Plotting libraries are imported by the functions using them, importing nbanalyzer stays cheap for jobs that do not plot
+from __future__ import annotations
+from io import BytesIO
+from typing import TYPE_CHECKING
 import numpy as np
-import seaborn as sns
-import matplotlib.pyplot as plt
-import plotly.express as px
-import plotly.graph_objects as go
-from pandas import DataFrame, merge
-from copy import deepcopy
+from pandas import DataFrame
 from .basketball_reference_api import *
+from .views import per_75, min_attempts
+from .figure_cache import cached_plotly_figure, cached_image
+from .rendering import HIGHLIGHT_COLOR, render_mode, scatter_trace, highlighted, downsample, add_highlights, compact_figure
+from .history import FIRST_THREE_POINT_SEASON, shooting_trends, correlation_by_era, era_seasons, season_leaders
 
 SCORING_PLOT_COLOR = '#2a87df'
 SHOOTING_PLOT_COLOR = '#6cc644'
 PLAYMAKING_PLOT_COLOR = '#f5982c'
 
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
+
+@cached_plotly_figure
 def gen_scoring_efficiency_plot(season: int, best_players: list[str]) -> go.Figure:
     """
     Generates points per 75 x TS% plot
     """
-    per_100_stats = deepcopy(get_players_data(season, 'per_poss'))
+    import plotly.express as px
+    per_100_stats = get_players_data(season, 'per_poss')
     advanced_stats = get_players_data(season, 'advanced')
     
-    # Calculating points per 75 
-    per_100_stats['PTS'] = per_100_stats['PTS'].apply(lambda x: x*.75)
-    per_75_stats = per_100_stats    
     avg_ts_percentage = round(advanced_stats['TS%'].mean(), 3)
-    combined = merge(per_75_stats, advanced_stats, on='Player', suffixes=('', '_y'))
+    combined = per_100_stats[['Player', 'Pos']].join(advanced_stats[['TS%']], how='inner')
+    # Calculating points per 75 
+    combined['PTS'] = per_75(per_100_stats['PTS'])
+    combined = downsample(combined, 'PTS', 'TS%', keep=highlighted(combined, best_players))
     
     # Plottings data
     fig = px.scatter(data_frame=combined, x='PTS', y='TS%',
@@ -30,7 +38,9 @@ def gen_scoring_efficiency_plot(season: int, best_players: list[str]) -> go.Figu
                      color='Pos',
                      range_x=[0, 40],
                      opacity=.65,
-                     template="plotly_dark")
+                     template="plotly_dark",
+                     render_mode=render_mode(len(combined)))
+    add_highlights(fig, combined, best_players, 'PTS', 'TS%')
 
     
     fig.add_hline(y=avg_ts_percentage, 
@@ -61,35 +71,47 @@ def gen_scoring_efficiency_plot(season: int, best_players: list[str]) -> go.Figu
         zeroline = True
     )
 
-    return fig
+    return compact_figure(fig)
 
+@cached_plotly_figure
 def gen_on_off_plot(season: int, best_players: list[str]) -> go.Figure:
     """
     Generates On-Off, OnCourt and BPM plots
     """
-    play_by_play = get_players_data(season, 'play-by-play', 1)
-    advanced_stats = get_players_data(season, 'advanced')
+    import plotly.graph_objects as go
+    play_by_play = join_stat_types(season, {'play-by-play': ['On-Off', 'OnCourt'], 'advanced': ['BPM']})
+    play_by_play = downsample(play_by_play, 'On-Off', 'BPM', keep=highlighted(play_by_play, best_players))
+    Scatter = scatter_trace(len(play_by_play))
 
     fig = go.Figure()
 
-    fig.add_trace(go.Scatter(x=np.full_like(play_by_play['On-Off'].values, -.25), 
+    fig.add_trace(Scatter(x=np.full_like(play_by_play['On-Off'].values, -.25), 
                              y=play_by_play['On-Off'].values,
                              mode='markers', name='On-Off',
                              opacity=.75,
                              hovertext=play_by_play.Player.values))
     
-    fig.add_trace(go.Scatter(x=np.zeros_like(play_by_play['OnCourt'].values), 
+    fig.add_trace(Scatter(x=np.zeros_like(play_by_play['OnCourt'].values), 
                              y=play_by_play['OnCourt'].values,
                              mode='markers', name='OnCourt',
                              opacity=.75,
                              hovertext=play_by_play.Player.values))
 
     
-    fig.add_trace(go.Scatter(x=np.full_like(advanced_stats.BPM.values, .25), 
-                             y=advanced_stats.BPM.values,
+    fig.add_trace(Scatter(x=np.full_like(play_by_play.BPM.values, .25), 
+                             y=play_by_play.BPM.values,
                              mode='markers', name='BPM',
                              opacity=.75,
                              hovertext=play_by_play.Player.values))
+
+    # Highlighted players are drawn at the position of each of their three metrics
+    highlights = play_by_play[highlighted(play_by_play, best_players)]
+    if len(highlights):
+        fig.add_trace(go.Scatter(x=np.repeat([-.25, 0., .25], len(highlights)),
+                                 y=np.concatenate([highlights['On-Off'].values, highlights['OnCourt'].values, highlights['BPM'].values]),
+                                 mode='markers', name='Highlighted',
+                                 hovertext=np.tile(highlights.Player.astype(str).values, 3),
+                                 marker=dict(color=HIGHLIGHT_COLOR, size=9, line=dict(width=1, color='black'))))
     fig.update_xaxes(
         showgrid = False,
         showline = False,
@@ -108,28 +130,44 @@ def gen_on_off_plot(season: int, best_players: list[str]) -> go.Figure:
 
     fig.update_layout(xaxis_range=[-.5,.5], yaxis_range=[0.,25.], height=680)
     
-    return fig
+    return compact_figure(fig)
 
-def draw_intercorrelation_heatmap(season: int):
+def heatmap_png(corr: DataFrame) -> bytes:
     """
-    Generates intercorrelation heatmap from stats
+    Draws the lower triangle of a correlation matrix as a PNG image
     """
-    df_selected_team = get_players_data(season, 'per_game')
+    import seaborn as sns
+    import matplotlib.pyplot as plt
 
-    corr = df_selected_team.corr()
     mask = np.zeros_like(corr)
     mask[np.triu_indices_from(mask)] = True
     with sns.axes_style("white"):
         f, ax = plt.subplots(figsize=(7, 5))
         ax = sns.heatmap(corr, mask=mask, vmax=1, square=True)
+    image = BytesIO()
+    f.savefig(image, format='png', bbox_inches='tight')
+    plt.close(f)
+    return image.getvalue()
 
+@cached_image
+def draw_intercorrelation_heatmap(season: int) -> bytes:
+    """
+    Generates intercorrelation heatmap from stats, returned as a PNG image
+    """
+    df_selected_team = get_players_data(season, 'per_game')
+
+    corr = df_selected_team.select_dtypes('number').corr()
+    return heatmap_png(corr)
+
+@cached_plotly_figure
 def gen_shooting_efficiency_plot(season: int, minimum_attempts=2) -> go.Figure:
     """
     Generates 3PA per 100 possessions x 3P% plot
     """
-    per_100_stats = deepcopy(get_players_data(season, 'per_poss'))
-    per_100_stats = per_100_stats[per_100_stats['3PA'] >= minimum_attempts]
+    import plotly.express as px
+    per_100_stats = min_attempts(get_players_data(season, 'per_poss'), '3PA', minimum_attempts, ['Player', 'Pos', '3PA', '3P%'])
     avg_3p_percentage = round(per_100_stats['3P%'].mean(), 3)
+    per_100_stats = downsample(per_100_stats, '3PA', '3P%')
     
     # Plottings data
     fig = px.scatter(data_frame=per_100_stats,
@@ -138,7 +176,8 @@ def gen_shooting_efficiency_plot(season: int, minimum_attempts=2) -> go.Figure:
                      opacity=.65,
                      template="plotly_dark",
                      hover_name='Player',
-                     color='Pos')
+                     color='Pos',
+                     render_mode=render_mode(len(per_100_stats)))
 
     fig.add_hline(y=avg_3p_percentage, 
                   line_width=2,
@@ -168,13 +207,15 @@ def gen_shooting_efficiency_plot(season: int, minimum_attempts=2) -> go.Figure:
         zeroline = True
     )
 
-    return fig
+    return compact_figure(fig)
 
+@cached_plotly_figure
 def gen_playmaking_plot(season: int) -> go.Figure:
     """
     Generates Box Creation x Offensive Load% plot
     """
-    advanced_box_score = get_advanced_metrics(season)
+    import plotly.express as px
+    advanced_box_score = downsample(get_advanced_metrics(season), 'Offensive Load', 'Creation')
     
     # Plottings data
     fig = px.scatter(data_frame=advanced_box_score,
@@ -183,7 +224,8 @@ def gen_playmaking_plot(season: int) -> go.Figure:
                      opacity=.65,
                      template="plotly_dark",
                      hover_name='Player',
-                     color='Pos')
+                     color='Pos',
+                     render_mode=render_mode(len(advanced_box_score)))
 
     fig.update_xaxes(
         title_text = "Offensive Load",
@@ -205,14 +247,70 @@ def gen_playmaking_plot(season: int) -> go.Figure:
         zeroline = True
     )
 
+    return compact_figure(fig)
+
+# League history figures take the last season of their range first, so they expire and are versioned with it
+
+@cached_plotly_figure
+def gen_shooting_trends_plot(last_season: int, first_season: int = FIRST_THREE_POINT_SEASON, by: str = 'season') -> go.Figure:
+    """
+    Generates the league 3PA per 36 and 3P% time series, by season or by era
+    """
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    trends = shooting_trends(range(max(first_season, FIRST_THREE_POINT_SEASON), last_season + 1), by)
+
+    fig = make_subplots(specs=[[{'secondary_y': True}]])
+    fig.add_trace(go.Bar(x=trends.index, y=trends['3PA per 36'], name='3PA per 36',
+                         marker_color=SHOOTING_PLOT_COLOR, opacity=.65), secondary_y=False)
+    fig.add_trace(go.Scatter(x=trends.index, y=trends['3P%'], name='3P%', mode='lines+markers',
+                             line_color=SCORING_PLOT_COLOR), secondary_y=True)
+    fig.update_layout(template="plotly_dark", hovermode='x unified')
+    fig.update_xaxes(title_text = trends.index.name, title_font = {"size": 15}, title_standoff = 20)
+    fig.update_yaxes(title_text = "3-Point Attempts per 36", title_font = {"size": 15}, secondary_y=False)
+    fig.update_yaxes(title_text = "3P%", title_font = {"size": 15}, showgrid = False, secondary_y=True)
+
     return fig
 
+@cached_plotly_figure
+def gen_season_leaders_plot(last_season: int, first_season: int, metric: str, top: int = 10) -> go.Figure:
+    """
+    Generates the time series of the top players of every season in an advanced box score metric, the leader is joined by a line
+    """
+    import plotly.express as px
+    import plotly.graph_objects as go
+    leaders = season_leaders(range(first_season, last_season + 1), metric, top)
+    first = leaders[leaders['Rank'] == 1]
+
+    fig = px.scatter(data_frame=leaders, x='Season', y=metric,
+                     hover_name='Player',
+                     hover_data=['Rank'],
+                     opacity=.45,
+                     template="plotly_dark",
+                     render_mode=render_mode(len(leaders)))
+    fig.update_traces(marker_color=PLAYMAKING_PLOT_COLOR)
+    fig.add_trace(go.Scatter(x=first['Season'], y=first[metric], mode='lines+markers', name='Leader',
+                             hovertext=first['Player'], line_color=SCORING_PLOT_COLOR))
+
+    fig.update_xaxes(title_text = "Season", title_font = {"size": 15}, title_standoff = 20)
+    fig.update_yaxes(title_text = metric, title_font = {"size": 15}, title_standoff = 20)
+
+    return compact_figure(fig)
+
+@cached_image
+def draw_era_correlation_heatmap(last_season: int, first_season: int, era: str) -> bytes:
+    """
+    Generates the intercorrelation heatmap of per game stats over every season of an era, returned as a PNG image
+    """
+    corr = correlation_by_era(era_seasons(era, first_season, last_season))[era]
+    return heatmap_png(corr)
+
 def get_player_percentile_from_advanced_stat(df: DataFrame, player: str, stat: str) -> float:
     if stat in ADVANCED_BOX_SCORE_COLS:
         advanced_box_score = df
         temp = advanced_box_score[f'{stat}'].rank(method='max', pct=True)
         temp = temp.to_frame()
         temp['Player'] = advanced_box_score['Player']
-        temp = temp.loc[temp['Player'].str.match(player)]
+        temp = temp.loc[temp['Player'] == player]
         return temp
     return 0.
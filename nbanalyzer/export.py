@@ -0,0 +1,204 @@
+"""
+Exports of stat tables as CSV, Parquet or Arrow IPC files. Tables are converted to Arrow and written in record batches to a binary
+file object, so no export is ever held as one Python string. Bulk exports stream season partitions from the warehouse:
+
+    python -m nbanalyzer.export --seasons 1980-2022 --stats per_game,advanced --format parquet --output history.zip
+"""
+import argparse
+import sys
+import time
+import zipfile
+from io import BytesIO
+from typing import BinaryIO, NamedTuple
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from .history import season_partitions, stored_partition
+from .ingest import PAGE_STAT_TYPES, parse_seasons
+from .instrumentation import configure_from_env, size, span
+
+BATCH_ROWS = 64 * 1024
+
+class ExportFormat(NamedTuple):
+    mime: str
+    extension: str
+
+EXPORT_FORMATS = {
+    'csv': ExportFormat('text/csv', 'csv'),
+    'parquet': ExportFormat('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ExportFormat('application/vnd.apache.arrow.file', 'arrow'),
+}
+EXPORT_STAT_TYPES = PAGE_STAT_TYPES + ['advanced_box_score']
+
+def _writer(fmt: str, sink: BinaryIO, schema: pa.Schema):
+    if fmt == 'csv':
+        return pa_csv.CSVWriter(sink, schema)
+    if fmt == 'parquet':
+        return pq.ParquetWriter(sink, schema)
+    if fmt == 'arrow':
+        return pa.ipc.new_file(sink, schema)
+    raise ValueError(f'Unknown export format: {fmt}')
+
+def _arrow_frame(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.reset_index()
+    for col in df.columns[df.dtypes == 'category']:
+        df[col] = df[col].astype(str)
+    return df
+
+def _widened(data_type: pa.DataType) -> pa.DataType:
+    if pa.types.is_integer(data_type):
+        return pa.int64()
+    if pa.types.is_floating(data_type):
+        return pa.float64()
+    if pa.types.is_boolean(data_type) or pa.types.is_null(data_type):
+        return data_type
+    return pa.string()
+
+def unify_schemas(schemas) -> pa.Schema:
+    """
+    Returns a schema with every column of schemas in the order they first appear. Integers are widened to int64 and floats to
+    float64, since each season is downcast on its own, and columns that are numeric in some seasons and text in others are text.
+    """
+    types = {}
+    for schema in schemas:
+        for field in schema:
+            data_type = _widened(field.type)
+            previous = types.setdefault(field.name, data_type)
+            if previous == data_type or pa.types.is_null(data_type):
+                continue
+            if pa.types.is_null(previous):
+                types[field.name] = data_type
+            elif pa.types.is_integer(previous) or pa.types.is_floating(previous):
+                numeric = pa.types.is_integer(data_type) or pa.types.is_floating(data_type)
+                types[field.name] = pa.float64() if numeric else pa.string()
+            else:
+                types[field.name] = pa.string()
+    return pa.schema(list(types.items()))
+
+def arrow_schema(df: pd.DataFrame) -> pa.Schema:
+    """
+    Returns the Arrow schema to_arrow gives df, without converting its values
+    """
+    return pa.Schema.from_pandas(_arrow_frame(df), preserve_index=False)
+
+def to_arrow(df: pd.DataFrame, schema: pa.Schema = None) -> pa.Table:
+    """
+    Returns df as an Arrow table with its PlayerID index as the first column, categorical columns are written as plain text.
+    With a schema, columns are cast to it and the columns df lacks are filled with nulls.
+    """
+    table = pa.Table.from_pandas(_arrow_frame(df), preserve_index=False)
+    if schema is None:
+        return table
+    columns = [table[field.name].cast(field.type) if field.name in table.column_names else pa.nulls(table.num_rows, field.type)
+               for field in schema]
+    return pa.Table.from_arrays(columns, schema=schema)
+
+def write_table(df: pd.DataFrame, fmt: str, sink: BinaryIO) -> None:
+    """
+    Writes a table to a binary file object in the selected format
+    """
+    table = to_arrow(df)
+    with span('export', format=fmt), _writer(fmt, sink, table.schema) as writer:
+        if fmt == 'parquet':
+            writer.write_table(table, row_group_size=BATCH_ROWS)
+        else:
+            writer.write_table(table, max_chunksize=BATCH_ROWS)
+
+def export_table(df: pd.DataFrame, fmt: str) -> bytes:
+    """
+    Returns the encoded file of a table, for download buttons
+    """
+    sink = BytesIO()
+    write_table(df, fmt, sink)
+    size('export', sink.tell(), format=fmt)
+    return sink.getvalue()
+
+def export_file_name(name: str, fmt: str) -> str:
+    return f'{name}.{EXPORT_FORMATS[fmt].extension}'
+
+def _with_season(season: int, partition: pd.DataFrame) -> pd.DataFrame:
+    partition = partition.copy(deep=False)
+    partition.insert(0, 'Season', season)
+    return partition
+
+def stored_schema(path: str) -> pa.Schema:
+    """
+    Returns the Arrow schema of a season partition stored in the warehouse from the Parquet metadata only, with the columns
+    arrow_schema gives the loaded partition. Categorical columns are text like in to_arrow.
+    """
+    schema = pq.read_schema(path)
+    index = [name for name in schema.pandas_metadata['index_columns'] if isinstance(name, str)]
+    fields = [schema.field(name) for name in index] + [pa.field('Season', pa.int64())]
+    fields += [field for field in schema if field.name not in index]
+    return pa.schema([field.with_type(field.type.value_type) if pa.types.is_dictionary(field.type) else field for field in fields])
+
+def season_schemas(seasons: list[int], stat_type: str) -> list[pa.Schema]:
+    """
+    Returns the schema of every season partition, read from the warehouse metadata. Only the partitions missing from the
+    warehouse are loaded, which stores them for the pass writing them.
+    """
+    schemas = []
+    for season in seasons:
+        path = stored_partition(season, stat_type)
+        if path is not None:
+            schemas.append(stored_schema(path))
+        else:
+            for season, partition in season_partitions([season], stat_type):
+                schemas.append(arrow_schema(_with_season(season, partition)))
+    return schemas
+
+def write_seasons(seasons, stat_type: str, fmt: str, sink: BinaryIO) -> int:
+    """
+    Writes the tables of a stat type for many seasons as one file with a Season column, one season partition at a time.
+    The schema fitting every season is collected first from the Parquet metadata of the stored partitions. Returns the number
+    of rows written.
+    """
+    seasons = list(seasons)
+    schemas = season_schemas(seasons, stat_type)
+    if not schemas:
+        return 0
+    schema = unify_schemas(schemas)
+    rows = 0
+    with _writer(fmt, sink, schema) as writer:
+        for season, partition in season_partitions(seasons, stat_type):
+            table = to_arrow(_with_season(season, partition), schema)
+            writer.write_table(table)
+            rows += table.num_rows
+    return rows
+
+def write_bulk_export(seasons, stat_types: list[str], fmt: str, sink: BinaryIO) -> dict:
+    """
+    Writes a zip archive with one file per stat type covering every season, returns the number of rows of each file
+    """
+    rows = {}
+    # Parquet and Arrow files are compressed already
+    compression = zipfile.ZIP_DEFLATED if fmt == 'csv' else zipfile.ZIP_STORED
+    with zipfile.ZipFile(sink, 'w', compression=compression) as archive:
+        for stat_type in stat_types:
+            info = zipfile.ZipInfo(export_file_name(stat_type, fmt), date_time=time.localtime()[:6])
+            info.compress_type = compression
+            with span('export', format=fmt, stat_type=stat_type), archive.open(info, 'w') as member:
+                rows[stat_type] = write_seasons(seasons, stat_type, fmt, member)
+    return rows
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m nbanalyzer.export', description='Export stored seasons as CSV, Parquet or Arrow files')
+    parser.add_argument('--seasons', default='1980-2022', help="seasons to export, e.g. '1980-2022' or '2020,2022'")
+    parser.add_argument('--stats', default='per_game', help=f"comma separated list of {', '.join(EXPORT_STAT_TYPES)}")
+    parser.add_argument('--format', default='parquet', choices=list(EXPORT_FORMATS))
+    parser.add_argument('--output', required=True, help='zip archive to write, one file per stat type')
+    args = parser.parse_args(argv)
+    configure_from_env()
+
+    stats = args.stats.split(',')
+    unknown = [stat for stat in stats if stat not in EXPORT_STAT_TYPES]
+    if unknown:
+        parser.error(f'Unknown stat types: {", ".join(unknown)}')
+    with open(args.output, 'wb') as sink:
+        rows = write_bulk_export(parse_seasons(args.seasons), stats, args.format, sink)
+    print(', '.join(f'{count} {stat_type} rows' for stat_type, count in rows.items()))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
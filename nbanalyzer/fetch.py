@@ -0,0 +1,205 @@
+"""
+Page fetching. The fetch mode selects the backend every page goes through: 'live' downloads from the site, 'record' downloads and
+saves every page into a fixture store, 'replay' serves pages from the fixture store only and never touches the network.
+
+    NBANALYZER_FETCH_MODE=record NBANALYZER_FIXTURES=benchmarks/fixtures python -m nbanalyzer.ingest --seasons 2020-2022 --force
+"""
+import hashlib
+import os
+import threading
+import time
+from typing import NamedTuple, Optional
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from .instrumentation import count, size, span
+
+MAX_CONNECTIONS_PER_HOST = 4
+MAX_RETRIES = 4
+BACKOFF_SECONDS = 1.
+TIMEOUT_SECONDS = 30.
+RETRY_STATUS = {429, 500, 502, 503, 504}
+FETCH_MODES = ['live', 'record', 'replay']
+FETCH_MODE = os.environ.get('NBANALYZER_FETCH_MODE', 'live')
+FIXTURES_DIR = os.environ.get('NBANALYZER_FIXTURES', os.path.join(os.path.expanduser('~'), '.cache', 'nbanalyzer', 'fixtures'))
+
+class Page(NamedTuple):
+    url: str
+    text: Optional[str]
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def not_modified(self) -> bool:
+        return self.text is None
+
+class Fetcher:
+    """
+    Thread safe page fetcher reusing pooled connections, with a concurrency limit per host, retries with exponential backoff
+    and conditional requests. Urls that are not http(s) are read as local files.
+    """
+    def __init__(self, max_per_host: int = MAX_CONNECTIONS_PER_HOST, retries: int = MAX_RETRIES, backoff: float = BACKOFF_SECONDS,
+                 timeout: float = TIMEOUT_SECONDS):
+        self.max_per_host = max_per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=max_per_host)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._host_slots = {}
+        self._lock = threading.Lock()
+
+    def _slot(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_slots[host]
+
+    def get(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> Page:
+        """
+        Returns the page at url, its text is None when the server answers that the validators are still current
+        """
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            with span('fetch', source='file'), open(url, 'rb') as f:
+                content = f.read()
+            size('payload', len(content), stage='fetch')
+            return Page(url, content.decode('utf-8'))
+
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+        for attempt in range(self.retries + 1):
+            try:
+                with self._slot(parts.netloc), span('fetch', source='http'):
+                    response = self.session.get(url, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                count('fetch_retries', reason='connection')
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+
+            if response.status_code in RETRY_STATUS and attempt < self.retries:
+                count('fetch_retries', reason=str(response.status_code))
+                retry_after = response.headers.get('Retry-After', '')
+                time.sleep(float(retry_after) if retry_after.isdigit() else self.backoff * 2 ** attempt)
+                continue
+            if response.status_code == 304:
+                count('fetch_not_modified')
+                return Page(url, None, etag, last_modified)
+            response.raise_for_status()
+            size('payload', len(response.content), stage='fetch')
+            return Page(url, response.text, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+
+def page_etag(text: str) -> str:
+    return f'"{hashlib.sha1(text.encode()).hexdigest()}"'
+
+class FixtureStore:
+    """
+    Saved pages laid out like the site, e.g. leagues/NBA_2022_per_game.html and awards/awards_2022.html, whatever the host
+    they were downloaded from
+    """
+    def __init__(self, directory: str = FIXTURES_DIR):
+        self.directory = directory
+
+    def path(self, url: str) -> str:
+        relative = urlsplit(url).path.lstrip('/')
+        if not relative or '..' in relative.split('/'):
+            raise ValueError(f'No fixture path for {url}')
+        return os.path.join(self.directory, *relative.split('/'))
+
+    def load(self, url: str) -> Optional[str]:
+        try:
+            with open(self.path(url), encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def save(self, url: str, text: str) -> None:
+        path = self.path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+class RecordingFetcher(Fetcher):
+    """
+    Live fetcher saving every downloaded page into a fixture store
+    """
+    def __init__(self, store: FixtureStore, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+
+    def get(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> Page:
+        page = super().get(url, etag, last_modified)
+        if not page.not_modified:
+            self.store.save(url, page.text)
+            count('fixtures_recorded')
+        return page
+
+class ReplayFetcher:
+    """
+    Serves pages from a fixture store only, pages missing from it raise FileNotFoundError. ETags are content hashes so
+    conditional requests behave like they do against the site.
+    """
+    def __init__(self, store: FixtureStore):
+        self.store = store
+
+    def get(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> Page:
+        with span('fetch', source='replay'):
+            text = self.store.load(url)
+        if text is None:
+            raise FileNotFoundError(f'No fixture for {url} in {self.store.directory}')
+        current = page_etag(text)
+        if etag == current:
+            count('fetch_not_modified')
+            return Page(url, None, etag, last_modified)
+        size('payload', len(text.encode('utf-8')), stage='fetch')
+        return Page(url, text, current)
+
+def make_fetcher(mode: str = None, fixtures: str = None, **kwargs):
+    """
+    Returns a fetcher for a fetch mode, FETCH_MODE by default. kwargs configure the live fetcher.
+    """
+    mode = mode or FETCH_MODE
+    if mode == 'live':
+        return Fetcher(**kwargs)
+    if mode == 'record':
+        return RecordingFetcher(FixtureStore(fixtures or FIXTURES_DIR), **kwargs)
+    if mode == 'replay':
+        return ReplayFetcher(FixtureStore(fixtures or FIXTURES_DIR))
+    raise ValueError(f'Unknown fetch mode: {mode}, expected one of {", ".join(FETCH_MODES)}')
+
+_default_fetcher = None
+_default_lock = threading.Lock()
+
+def default_fetcher() -> Fetcher:
+    """
+    Returns the fetcher shared by the whole process
+    """
+    global _default_fetcher
+    with _default_lock:
+        if _default_fetcher is None:
+            _default_fetcher = make_fetcher()
+        return _default_fetcher
+
+def set_fetcher(fetcher) -> None:
+    """
+    Replaces the fetcher shared by the whole process, any object with the get method of Fetcher can be plugged in
+    """
+    global _default_fetcher
+    with _default_lock:
+        _default_fetcher = fetcher
+
+def fetch_page(url: str) -> str:
+    """
+    Returns the text of the page at url
+    """
+    return default_fetcher().get(url).text
@@ -0,0 +1,154 @@
+"""
+Render cache for figures. Figures are pure functions of their arguments, so plotly figures are kept as serialized JSON and
+matplotlib figures as rendered PNG, in a size bounded LRU in memory backed by a size bounded directory on disk.
+"""
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+import types
+from collections import OrderedDict
+from typing import Callable, Optional
+from . import warehouse
+from .instrumentation import count, size, span
+
+FIGURE_CACHE_DIR = os.environ.get('NBANALYZER_FIGURE_CACHE', os.path.join(warehouse.WAREHOUSE_DIR, 'figures'))
+MEMORY_ENTRIES = int(os.environ.get('NBANALYZER_FIGURE_CACHE_ENTRIES', 128))
+DISK_ENTRIES = int(os.environ.get('NBANALYZER_FIGURE_CACHE_DISK_ENTRIES', 2048))
+# Bumped whenever the figures drawn from the same tables change, e.g. a shared trace or layout helper, the code of the generator
+# itself is part of the key already
+FIGURE_CACHE_VERSION = 2
+
+def _jsonable(value):
+    return value.tolist() if hasattr(value, 'tolist') else str(value)
+
+@functools.lru_cache(maxsize=None)
+def _code_digest(code: types.CodeType) -> str:
+    # Nested functions are hashed by their code, their repr holds a memory address, and frozensets in no stable order
+    digest = hashlib.sha1(code.co_code + repr(code.co_names).encode())
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            const = _code_digest(const)
+        elif isinstance(const, frozenset):
+            const = sorted(map(repr, const))
+        digest.update(repr(const).encode())
+    return digest.hexdigest()
+
+def figure_key(func: Callable, args: tuple, kwargs: dict) -> str:
+    """
+    Returns the cache key of a call, arguments such as pandas series are keyed by their values. The first argument is the season,
+    its version stamp is part of the key so figures drawn before a refresh are not shown again. Figures stored by an older
+    version of the generator or of FIGURE_CACHE_VERSION are not read back.
+    """
+    call = [func.__module__, func.__qualname__, _code_digest(func.__code__), FIGURE_CACHE_VERSION, warehouse.FORMAT_VERSION,
+            warehouse.season_version(args[0]), args, kwargs]
+    return hashlib.sha1(json.dumps(call, default=_jsonable, sort_keys=True).encode()).hexdigest()
+
+class FigureCache:
+    """
+    Two level LRU cache of serialized figures, entries of the current season expire like the tables they were drawn from
+    """
+    def __init__(self, directory: str = FIGURE_CACHE_DIR, memory_entries: int = MEMORY_ENTRIES, disk_entries: int = DISK_ENTRIES):
+        self.directory = directory
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, key: str, extension: str) -> str:
+        return os.path.join(self.directory, f'{key}.{extension}')
+
+    def get(self, key: str, season: int, extension: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, payload = entry
+                if season < warehouse.current_season() or time.time() - created < warehouse.CURRENT_SEASON_TTL:
+                    self._memory.move_to_end(key)
+                    return payload
+                del self._memory[key]
+
+        path = self._path(key, extension)
+        if not warehouse.is_fresh(season, path):
+            return None
+        with open(path, 'rb') as f:
+            payload = f.read()
+        self._remember(key, os.path.getmtime(path), payload)
+        # Access times drive the eviction of disk entries
+        os.utime(path, (time.time(), os.path.getmtime(path)))
+        return payload
+
+    def put(self, key: str, extension: str, payload: bytes) -> None:
+        self._remember(key, time.time(), payload)
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key, extension)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        self._evict_disk()
+
+    def _remember(self, key: str, created: float, payload: bytes) -> None:
+        with self._lock:
+            self._memory[key] = (created, payload)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _evict_disk(self) -> None:
+        entries = [entry for entry in os.scandir(self.directory) if not entry.name.endswith('.tmp')]
+        if len(entries) <= self.disk_entries:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_atime)
+        for entry in entries[:len(entries) - self.disk_entries]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+figure_cache = FigureCache()
+
+def cached_plotly_figure(func: Callable) -> Callable:
+    """
+    Caches a plotly figure generator whose first argument is the season, hits are rebuilt from the stored JSON
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = figure_key(func, args, kwargs)
+        payload = figure_cache.get(key, args[0], 'json')
+        if payload is None:
+            count('cache_miss', cache='figure', figure=func.__name__)
+            with span('figure', figure=func.__name__):
+                payload = func(*args, **kwargs).to_json().encode()
+            figure_cache.put(key, 'json', payload)
+        else:
+            count('cache_hit', cache='figure', figure=func.__name__)
+        size('payload', len(payload), stage='figure')
+        import plotly.io as pio
+        return pio.from_json(payload.decode())
+    return wrapper
+
+def cached_image(func: Callable) -> Callable:
+    """
+    Caches an image renderer whose first argument is the season and that returns encoded image bytes
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = figure_key(func, args, kwargs)
+        payload = figure_cache.get(key, args[0], 'png')
+        if payload is None:
+            count('cache_miss', cache='figure', figure=func.__name__)
+            with span('figure', figure=func.__name__):
+                payload = func(*args, **kwargs)
+            figure_cache.put(key, 'png', payload)
+        else:
+            count('cache_hit', cache='figure', figure=func.__name__)
+        size('payload', len(payload), stage='figure')
+        return payload
+    return wrapper
@@ -0,0 +1,143 @@
+"""
+League history across seasons. Season tables are streamed one partition at a time from the warehouse and folded into small
+running aggregates, so questions spanning every season never hold more than one season in memory.
+"""
+from typing import Iterator, Optional
+import numpy as np
+import pandas as pd
+from . import warehouse
+from .basketball_reference_api import (ADVANCED_METRIC_INPUTS, load_players_data, stat_type_header, join_tables, league_average_efg,
+                                       advanced_metrics_from)
+from .players import build_player_index
+
+FIRST_SEASON = 1977
+# The 3-point line was introduced in the 1979-80 season
+FIRST_THREE_POINT_SEASON = 1980
+SHOOTING_TREND_COLS = ['3P', '3PA', 'FGA', 'MP']
+
+def era(season: int) -> str:
+    """
+    Returns the decade of a season, e.g. 1986 -> '1980s'
+    """
+    return f'{season // 10 * 10}s'
+
+def era_seasons(name: str, first_season: int, last_season: int) -> range:
+    """
+    Returns the seasons of an era within first_season and last_season
+    """
+    start = int(name.rstrip('s'))
+    return range(max(start, first_season), min(start + 9, last_season) + 1)
+
+def load_partition(season: int, stat_type: str, columns: list[str] = None, filter_games: bool = True) -> pd.DataFrame:
+    """
+    Returns the table of a season for a stat type, reading only the selected columns from the warehouse. Missing tables are
+    downloaded and stored, without going through the per process caches of the app. filter_games keeps only the players with
+    at least half the games of the league leader, like the app's tables.
+    """
+    if stat_type == 'advanced_box_score':
+        table = warehouse.load_table(season, 'advanced_box_score', columns=columns)
+        if table is None:
+            per_game = load_partition(season, 'per_game')
+            tables = {stat_type: load_partition(season, stat_type) for stat_type in ADVANCED_METRIC_INPUTS}
+            per_100 = join_tables(build_player_index(per_game, season), tables, ADVANCED_METRIC_INPUTS)
+            table = advanced_metrics_from(per_100, league_average_efg(per_game))
+            warehouse.store_table(season, 'advanced_box_score', table)
+    else:
+        header = stat_type_header(stat_type)
+        table = warehouse.load_table(season, stat_type, columns=columns, header=header, filter_games=filter_games,
+                                     remove_duplicates=True)
+        if table is None:
+            table = load_players_data(season, stat_type, header, filter_games)
+    return table if columns is None else table[columns]
+
+def stored_partition(season: int, stat_type: str, filter_games: bool = True) -> Optional[str]:
+    """
+    Returns the warehouse file load_partition reads a partition from, None when it is missing or stale and would be downloaded
+    """
+    if stat_type == 'advanced_box_score':
+        path = warehouse.table_path(season, stat_type)
+    else:
+        path = warehouse.table_path(season, stat_type, header=stat_type_header(stat_type), filter_games=filter_games,
+                                    remove_duplicates=True)
+    return path if warehouse.is_fresh(season, path) else None
+
+def season_partitions(seasons, stat_type: str, columns: list[str] = None, filter_games: bool = True) -> Iterator[tuple[int, pd.DataFrame]]:
+    """
+    Yields the (season, table) partitions of a stat type one season at a time
+    """
+    for season in seasons:
+        yield season, load_partition(season, stat_type, columns, filter_games)
+
+def shooting_trends(seasons=None, by: str = 'season') -> pd.DataFrame:
+    """
+    Returns the league 3-point volume and accuracy by season, or by era when by is 'era': 3PA per 36 minutes, the share of field
+    goal attempts that are 3s and 3P%, computed from league totals. Every season since the 3-point line by default.
+    """
+    if seasons is None:
+        seasons = range(FIRST_THREE_POINT_SEASON, warehouse.current_season())
+    totals = {}
+    # League totals count every player, not only those over the games cutoff, traded players are counted once by their TOT row
+    for season, partition in season_partitions(seasons, 'totals', SHOOTING_TREND_COLS, filter_games=False):
+        key = season if by == 'season' else era(season)
+        totals[key] = totals.get(key, 0) + partition.sum().to_numpy(dtype=float)
+
+    trends = pd.DataFrame.from_dict(totals, orient='index', columns=SHOOTING_TREND_COLS)
+    trends.index.name = 'Season' if by == 'season' else 'Era'
+    trends['3PA per 36'] = trends['3PA'] / trends['MP'] * 36
+    trends['3PA Rate'] = trends['3PA'] / trends['FGA']
+    trends['3P%'] = (trends['3P'] / trends['3PA']).where(trends['3PA'] > 0)
+    return trends
+
+def _grown(matrix: np.ndarray, size: int) -> np.ndarray:
+    # Columns seen for the first time have no rows in the earlier partitions
+    return np.pad(matrix, ((0, size - len(matrix)), (0, size - len(matrix))))
+
+def correlation_by_era(seasons=None, stat_type: str = 'per_game', columns: list[str] = None) -> dict:
+    """
+    Returns {era: correlation matrix} of the selected columns, by default every numeric column found in any season, e.g. 3P
+    columns only appear from 1980. Like pandas.DataFrame.corr, each pair of columns uses the rows where both are present. Each
+    era keeps only the count, sums, sums of squares and cross products of every pair.
+    """
+    if seasons is None:
+        seasons = range(FIRST_SEASON, warehouse.current_season())
+    union = columns is None
+    columns = [] if union else list(columns)
+    moments = {}
+    for season, partition in season_partitions(seasons, stat_type, None if union else columns):
+        if union:
+            columns += [col for col in partition.select_dtypes('number').columns if col not in columns]
+        values = partition.reindex(columns=columns).to_numpy(dtype=float)
+        present = np.isfinite(values).astype(float)
+        filled = np.where(present > 0, values, 0.)
+        update = (present.T @ present, filled.T @ present, (filled ** 2).T @ present, filled.T @ filled)
+        previous = moments.get(era(season))
+        if previous is not None:
+            update = tuple(_grown(total, len(columns)) + value for total, value in zip(previous, update))
+        moments[era(season)] = update
+
+    correlations = {}
+    for name, (n, sums, squares, products) in moments.items():
+        n, sums, squares, products = (_grown(matrix, len(columns)) for matrix in (n, sums, squares, products))
+        # sums[i, j] is the sum of column i over the rows where column j is present as well
+        covariance = n * products - sums * sums.T
+        variance = n * squares - sums ** 2
+        with np.errstate(invalid='ignore', divide='ignore'):
+            correlation = covariance / np.sqrt(np.clip(variance * variance.T, 0, None))
+        correlation[n < 2] = np.nan
+        correlations[name] = pd.DataFrame(correlation, index=columns, columns=columns)
+    return correlations
+
+def season_leaders(seasons=None, metric: str = 'Scoring Rate', top: int = 10, stat_type: str = 'advanced_box_score') -> pd.DataFrame:
+    """
+    Returns the top players of every season in a metric, one row per Season and Rank. Every season by default.
+    """
+    if seasons is None:
+        seasons = range(FIRST_SEASON, warehouse.current_season())
+    leaders = []
+    for season, partition in season_partitions(seasons, stat_type, ['Player', metric]):
+        best = partition.nlargest(top, metric).reset_index()
+        best['Player'] = best['Player'].astype(str)
+        best.insert(0, 'Season', season)
+        best.insert(1, 'Rank', np.arange(1, len(best) + 1))
+        leaders.append(best)
+    return pd.concat(leaders, ignore_index=True)
@@ -0,0 +1,117 @@
+"""
+Streaming parser for basketball reference stat tables. Only the table with the requested id is kept, repeated header rows are
+skipped while streaming and typed columns are built straight from a per stat type schema.
+"""
+from io import BytesIO
+from typing import Optional
+import numpy as np
+import pandas as pd
+from lxml import etree
+
+TABLE_IDS = {
+    'per_game': 'per_game_stats',
+    'totals': 'totals_stats',
+    'per_minute': 'per_minute_stats',
+    'advanced': 'advanced_stats',
+    'per_poss': 'per_poss_stats',
+    'play-by-play': 'pbp_stats',
+}
+TEXT_COLUMNS = ['Player', 'Pos', 'Tm']
+COUNTING_COLUMNS = ['MP', 'FG', 'FGA', '3P', '3PA', '2P', '2PA', 'FT', 'FTA', 'ORB', 'DRB', 'TRB', 'AST', 'STL', 'BLK', 'TOV', 'PF', 'PTS']
+# Columns missing from a schema are floats
+SCHEMAS = {
+    'per_game': dict.fromkeys(['Age', 'G', 'GS'], 'int'),
+    'totals': dict.fromkeys(['Age', 'G', 'GS'] + COUNTING_COLUMNS, 'int'),
+    'per_minute': dict.fromkeys(['Age', 'G', 'GS', 'MP'], 'int'),
+    'per_poss': dict.fromkeys(['Age', 'G', 'GS', 'MP'], 'int'),
+    'advanced': dict.fromkeys(['Age', 'G', 'MP'], 'int'),
+    'play-by-play': dict.fromkeys(['Age', 'G', 'MP'], 'int'),
+}
+for _schema in SCHEMAS.values():
+    _schema.update(dict.fromkeys(TEXT_COLUMNS, 'text'))
+
+def _cell_text(cell) -> str:
+    return ''.join(cell.itertext()).strip()
+
+def _column_names(cells: list[str]) -> list[str]:
+    """
+    Names columns like pandas.read_html does, blank headers become 'Unnamed: i' and repeated ones get a .1, .2 suffix
+    """
+    names, seen = [], {}
+    for i, name in enumerate(cells):
+        name = name or f'Unnamed: {i}'
+        if name in seen:
+            seen[name] += 1
+            name = f'{name}.{seen[name]}'
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+def _typed_column(values: tuple, kind: str):
+    if kind == 'text':
+        return np.array(values, dtype=object)
+    # Blank cells are zeros, like the fillna(0) of the read_html path
+    values = [value.rstrip('%') or '0' for value in values]
+    try:
+        if kind == 'int':
+            try:
+                return np.array(values, dtype=np.int64)
+            except ValueError:
+                pass
+        return np.array(values, dtype=np.float64)
+    except ValueError:
+        return np.array(values, dtype=object)
+
+def _stream_rows(page: bytes, table_id: str):
+    """
+    Yields ('thead' | 'tbody', cell texts) for every row of the table with id table_id, other elements are discarded as soon as
+    they are parsed to keep memory flat
+    """
+    in_table = False
+    for event, element in etree.iterparse(BytesIO(page), events=('start', 'end'), html=True, encoding='utf-8'):
+        if event == 'start':
+            if element.tag == 'table' and element.get('id') == table_id:
+                in_table = True
+            continue
+
+        if element.tag == 'tr':
+            if in_table:
+                section = element.getparent().tag
+                if section == 'thead':
+                    yield section, [_cell_text(cell) for cell in element]
+                elif section != 'tfoot' and 'thead' not in (element.get('class') or '').split():
+                    yield 'tbody', [_cell_text(cell) for cell in element]
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+        elif element.tag == 'table':
+            if in_table:
+                return
+            element.clear()
+
+def parse_stats_table(page: str, table_id: str, header: int = 0, schema: Optional[dict] = None) -> Optional[pd.DataFrame]:
+    """
+    Returns the table with id table_id without its Rk column and repeated header rows, None when the page has no such table.
+    header selects the header row like in pandas.read_html.
+    """
+    header_rows, rows = [], []
+    for section, cells in _stream_rows(page.encode('utf-8'), table_id):
+        if section == 'thead':
+            header_rows.append(cells)
+        else:
+            rows.append(cells)
+    if not header_rows:
+        return None
+
+    columns = _column_names(header_rows[min(header, len(header_rows) - 1)])
+    # Footer rows such as league averages do not have a cell per column
+    rows = [row for row in rows if len(row) == len(columns)]
+    values = zip(*rows) if rows else [()] * len(columns)
+    schema = schema or {}
+
+    data = {}
+    for name, column in zip(columns, values):
+        if name != 'Rk':
+            data[name] = _typed_column(column, schema.get(name, 'float'))
+    return pd.DataFrame(data)
@@ -0,0 +1,113 @@
+"""
+Bulk ingest of basketball reference pages into the local warehouse
+
+    python -m nbanalyzer.ingest --seasons 1977-2022 --stats all
+
+Pages are downloaded concurrently and parsed as soon as they arrive, so a full warm-up is bound by bandwidth instead of
+sequential round trips.
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from . import warehouse
+from .basketball_reference_api import (STAT_TYPES, players_data_url, mvp_voting_url, parse_players_data, parse_mvp_voting, published_stat_types,
+                                     stat_type_header)
+from .fetch import Fetcher, MAX_CONNECTIONS_PER_HOST, make_fetcher
+from .instrumentation import configure_from_env, logger
+
+MVP = 'mvp'
+PAGE_STAT_TYPES = [stat_type for stat_type in STAT_TYPES if stat_type != 'advanced_box_score']
+
+def table_params(stat_type: str) -> dict:
+    if stat_type == MVP:
+        return {}
+    return dict(header=stat_type_header(stat_type), filter_games=True, remove_duplicates=True)
+
+def parse_seasons(text: str) -> list[int]:
+    """
+    Parses season lists such as '1977-2022' or '2016,2018,2020-2022'
+    """
+    seasons = []
+    for part in text.split(','):
+        start, _, end = part.partition('-')
+        seasons.extend(range(int(start), int(end or start) + 1))
+    return seasons
+
+def parse_stats(text: str) -> list[str]:
+    if text == 'all':
+        return PAGE_STAT_TYPES + [MVP]
+    stats = text.split(',')
+    unknown = [stat for stat in stats if stat not in PAGE_STAT_TYPES + [MVP]]
+    if unknown:
+        raise ValueError(f'Unknown stat types: {", ".join(unknown)}')
+    return stats
+
+def _fetch(fetcher: Fetcher, season: int, stat_type: str, base_url: str, force: bool):
+    url = mvp_voting_url(season, base_url) if stat_type == MVP else players_data_url(season, stat_type, base_url)
+    validators = {}
+    # Validators are only worth sending when there is a stale table to fall back on
+    if not force and os.path.exists(warehouse.table_path(season, stat_type, **table_params(stat_type))):
+        validators = warehouse.load_validators(season, stat_type)
+    return fetcher.get(url, validators.get('etag'), validators.get('last_modified'))
+
+def ingest(seasons: list[int], stats: list[str], workers: int = 8, max_per_host: int = MAX_CONNECTIONS_PER_HOST, base_url: str = None,
+           force: bool = False, fetcher: Fetcher = None) -> dict:
+    """
+    Downloads and stores every published (season, stat type) table that is missing or stale in the warehouse, returns how many
+    tables were stored, renewed without changes, skipped because they were fresh and failed
+    """
+    fetcher = fetcher or make_fetcher(max_per_host=max_per_host)
+    summary = {'stored': 0, 'not_modified': 0, 'fresh': 0, 'failed': 0}
+
+    jobs = []
+    for season in seasons:
+        # Pages the site does not publish for a season, e.g. play-by-play before 1997, are not requested
+        for stat_type in published_stat_types(season, stats):
+            if not force and warehouse.is_fresh(season, warehouse.table_path(season, stat_type, **table_params(stat_type))):
+                summary['fresh'] += 1
+            else:
+                jobs.append((season, stat_type))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_fetch, fetcher, season, stat_type, base_url, force): (season, stat_type) for season, stat_type in jobs}
+        # Pages are parsed here while the pool keeps downloading the remaining ones
+        for future in as_completed(futures):
+            season, stat_type = futures[future]
+            params = table_params(stat_type)
+            try:
+                page = future.result()
+                if page.not_modified:
+                    warehouse.renew_table(season, stat_type, **params)
+                    summary['not_modified'] += 1
+                    continue
+                if stat_type == MVP:
+                    table = parse_mvp_voting(page.text)
+                else:
+                    table = parse_players_data(page.text, **params, stat_type=stat_type)
+                warehouse.store_table(season, stat_type, table, **params)
+                warehouse.store_validators(season, stat_type, page.etag, page.last_modified)
+                summary['stored'] += 1
+            except Exception as e:
+                logger.error('FAILED %s %s: %s', season, stat_type, e)
+                summary['failed'] += 1
+
+    return summary
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m nbanalyzer.ingest', description='Prefetch basketball reference tables into the local warehouse')
+    parser.add_argument('--seasons', default='1977-2022', help="seasons to ingest, e.g. '1977-2022' or '2020,2022'")
+    parser.add_argument('--stats', default='all', help=f"'all' or a comma separated list of {', '.join(PAGE_STAT_TYPES + [MVP])}")
+    parser.add_argument('--workers', type=int, default=8, help='number of concurrent downloads')
+    parser.add_argument('--per-host', type=int, default=MAX_CONNECTIONS_PER_HOST, help='maximum concurrent connections per host')
+    parser.add_argument('--base-url', default=None, help='site to download from, e.g. a local stub server')
+    parser.add_argument('--force', action='store_true', help='download tables even if they are fresh')
+    args = parser.parse_args(argv)
+    configure_from_env()
+
+    summary = ingest(parse_seasons(args.seasons), parse_stats(args.stats), args.workers, args.per_host, args.base_url, args.force)
+    print(', '.join(f'{count} {state}' for state, count in summary.items()))
+    return 1 if summary['failed'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""
+Lightweight instrumentation of the hot paths. Stages report timing spans, cache hits and misses and payload sizes to a pluggable
+sink. No sink is installed by default and every call then returns right away.
+
+Set NBANALYZER_METRICS to 'logging' or to 'prometheus:<port>' to install a sink. The app and the command line entry points call
+configure_from_env, importing the package never installs a sink or binds a port, so worker processes can import it freely.
+NBANALYZER_LOG_LEVEL, e.g. INFO or DEBUG, shows the messages of the nbanalyzer logger, such as the pages downloaded.
+"""
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import NamedTuple, Optional
+
+logger = logging.getLogger('nbanalyzer')
+
+class Metric(NamedTuple):
+    kind: str  # 'timing' in seconds, 'count' or 'size' in bytes
+    name: str
+    value: float
+    tags: dict
+
+class LoggingSink:
+    """
+    Logs every metric on the nbanalyzer logger
+    """
+    def __init__(self, level: int = logging.INFO):
+        self.level = level
+
+    def emit(self, metric: Metric) -> None:
+        tags = ' '.join(f'{key}={value}' for key, value in metric.tags.items())
+        logger.log(self.level, '%s %s %.6g %s', metric.kind, metric.name, metric.value, tags)
+
+class MemorySink:
+    """
+    Keeps every metric in memory, meant for tests and benchmarks
+    """
+    def __init__(self):
+        self.metrics = []
+        self._lock = threading.Lock()
+
+    def emit(self, metric: Metric) -> None:
+        with self._lock:
+            self.metrics.append(metric)
+
+    def values(self, kind: str, name: str) -> list[float]:
+        return [metric.value for metric in self.metrics if metric.kind == kind and metric.name == name]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.metrics.clear()
+
+class PrometheusSink:
+    """
+    Aggregates metrics into counters rendered in the Prometheus text format, timings and sizes become _count and _sum series
+    """
+    def __init__(self):
+        self._series = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def emit(self, metric: Metric) -> None:
+        labels = tuple(sorted(metric.tags.items()))
+        with self._lock:
+            if metric.kind == 'count':
+                self._series[(f'nbanalyzer_{metric.name}_total', labels)] += metric.value
+            else:
+                unit = 'seconds' if metric.kind == 'timing' else 'bytes'
+                self._series[(f'nbanalyzer_{metric.name}_{unit}_count', labels)] += 1
+                self._series[(f'nbanalyzer_{metric.name}_{unit}_sum', labels)] += metric.value
+
+    def render(self) -> str:
+        with self._lock:
+            series = sorted(self._series.items())
+        lines = []
+        for (name, labels), value in series:
+            label_text = ','.join(f'{key}="{value}"' for key, value in labels)
+            lines.append(f'{name}{{{label_text}}} {value}' if labels else f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port: int, host: str = '') -> ThreadingHTTPServer:
+        """
+        Serves the metrics on http://host:port/metrics from a daemon thread
+        """
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = sink.render().encode()
+                self.send_response(200 if self.path == '/metrics' else 404)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+_sink = None
+_configured = False
+_configure_lock = threading.Lock()
+
+def set_sink(sink) -> None:
+    """
+    Installs the sink receiving every metric, None disables instrumentation
+    """
+    global _sink
+    _sink = sink
+
+def get_sink():
+    return _sink
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    def __init__(self, sink, name: str, tags: dict):
+        self.sink = sink
+        self.name = name
+        self.tags = tags
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        tags = self.tags if exc_type is None else {**self.tags, 'error': exc_type.__name__}
+        self.sink.emit(Metric('timing', self.name, time.perf_counter() - self.start, tags))
+        return False
+
+def span(name: str, **tags):
+    """
+    Times the enclosed block, e.g. with span('parse', stat_type='per_game'): ...
+    """
+    sink = _sink
+    if sink is None:
+        return _NULL_SPAN
+    return _Span(sink, name, tags)
+
+def count(name: str, value: float = 1, **tags) -> None:
+    sink = _sink
+    if sink is not None:
+        sink.emit(Metric('count', name, value, tags))
+
+def size(name: str, value: float, **tags) -> None:
+    """
+    Reports a payload size in bytes
+    """
+    sink = _sink
+    if sink is not None:
+        sink.emit(Metric('size', name, value, tags))
+
+def configure_logging(level) -> None:
+    """
+    Shows the records of the nbanalyzer logger from level on. A stderr handler is attached when no handler would receive them,
+    the last resort handler of Python only prints warnings and errors.
+    """
+    level = logging.getLevelNamesMapping()[level] if isinstance(level, str) else level
+    if logger.getEffectiveLevel() > level:
+        logger.setLevel(level)
+    if not logger.hasHandlers():
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        logger.addHandler(handler)
+
+def configure_from_env(value: Optional[str] = None):
+    """
+    Installs the sink selected by NBANALYZER_METRICS, or value, and returns the installed sink. Only the first call of a process
+    installs a sink and binds the Prometheus port, so entry points rerun by Streamlit can call it every time.
+    """
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return _sink
+        _configured = True
+        value = os.environ.get('NBANALYZER_METRICS', '') if value is None else value
+        level = os.environ.get('NBANALYZER_LOG_LEVEL')
+        if level:
+            configure_logging(level.upper())
+        if value == 'logging':
+            sink = LoggingSink()
+            configure_logging(sink.level)
+            set_sink(sink)
+        elif value.startswith('prometheus'):
+            sink = PrometheusSink()
+            _, _, port = value.partition(':')
+            if port:
+                sink.serve(int(port))
+            set_sink(sink)
+        return _sink
@@ -0,0 +1,59 @@
+"""
+Column-wise versions of the advanced box score formulas in basketball_reference_api, they accept numpy arrays or pandas series
+and compute a whole season, or many stacked seasons, in one pass
+"""
+import numpy as np
+import pandas as pd
+
+def spacing_column(attempts, percentage, league_avg_efg):
+    """
+    Vectorized spacing, league_avg_efg may be a scalar or one value per row when seasons are stacked
+    """
+    return (attempts * (percentage * 1.5)) - league_avg_efg
+
+def shooting_proficiency_column(attempts, percentage):
+    """
+    Vectorized shooting_proficiency
+    """
+    return (2/(1+np.exp(-attempts))-1)*percentage
+
+def box_creation_column(ass_per_100, pts_per_100, attempts, percentage, turnovers_per_100):
+    """
+    Vectorized box_creation
+    """
+    proficiency = shooting_proficiency_column(attempts, percentage)
+    return ass_per_100*0.1843+(pts_per_100+turnovers_per_100)*0.0969-2.3021*(proficiency)+0.0582*(ass_per_100*(pts_per_100+turnovers_per_100)*proficiency)-1.1942
+
+def offensive_load_column(ass, field_goals, free_throws, turnovers, box_creation):
+    """
+    Vectorized offensive_load
+    """
+    return ((ass-(0.38*box_creation))*0.75) + field_goals + free_throws*0.44 + box_creation + turnovers
+
+def league_avg_efg_by_season(per_game: pd.DataFrame, season_col: str = 'Season') -> pd.Series:
+    """
+    Returns the league average eFG% of each row's season from stacked per game tables
+    """
+    return per_game.groupby(season_col)['eFG%'].transform('mean')
+
+def advanced_metrics_table(per_100: pd.DataFrame, true_shooting, league_avg_efg) -> pd.DataFrame:
+    """
+    Returns the advanced box score table from per 100 possessions stats and the TS% of the same players, in the same order
+    """
+    pts = per_100['PTS'].to_numpy(dtype=float)
+    attempts = per_100['3PA'].to_numpy(dtype=float)
+    percentage = per_100['3P%'].to_numpy(dtype=float)
+    ast = per_100['AST'].to_numpy(dtype=float)
+    tov = per_100['TOV'].to_numpy(dtype=float)
+    creation = box_creation_column(ast, pts, attempts, percentage, tov)
+
+    return pd.DataFrame({
+        'Player': per_100['Player'].to_numpy(),
+        'Pos': per_100['Pos'].to_numpy(),
+        'Tm': per_100['Tm'].to_numpy(),
+        'Scoring Rate': pts,
+        'Efficiency(TS%)': np.asarray(true_shooting, dtype=float),
+        'Spacing': spacing_column(attempts, percentage, np.asarray(league_avg_efg, dtype=float)),
+        'Creation': creation,
+        'Offensive Load': offensive_load_column(ast, per_100['FGA'].to_numpy(dtype=float), per_100['FTA'].to_numpy(dtype=float), tov, creation),
+    }, index=per_100.index)
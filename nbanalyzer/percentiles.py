@@ -0,0 +1,16 @@
+"""
+Per season percentile index, every metric is ranked once for the whole league and players are looked up by PlayerID
+"""
+import pandas as pd
+
+def build_percentile_index(df: pd.DataFrame, stats: list[str]) -> pd.DataFrame:
+    """
+    Returns the percentile of every player in each stat, indexed like df
+    """
+    return df[stats].rank(method='max', pct=True)
+
+def lookup_percentiles(index: pd.DataFrame, player_ids: list[str]) -> pd.DataFrame:
+    """
+    Returns the percentile profiles of many players at once, ids missing from the index are left out
+    """
+    return index.loc[index.index.intersection(player_ids, sort=False)]
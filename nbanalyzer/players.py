@@ -0,0 +1,68 @@
+"""
+Canonical player keys, every stat table is indexed by PlayerID so tables of the same season join on it instead of row positions.
+A PlayerID is only unique within a season, tables of several seasons are keyed by (Season, PlayerID).
+"""
+import re
+import unicodedata
+import pandas as pd
+
+INDEX_NAME = 'PlayerID'
+
+def player_id(name: str) -> str:
+    """
+    Returns the normalized id of a player name, e.g. 'Nikola Jokić' -> 'nikola-jokic'. Hall of famers are marked with a trailing *
+    on some pages, it is not part of the id.
+    """
+    name = unicodedata.normalize('NFKD', str(name).rstrip('*'))
+    name = ''.join(c for c in name if not unicodedata.combining(c))
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+def player_ids(names: pd.Series) -> pd.Index:
+    """
+    Returns the PlayerID index of a column of names, each distinct name is normalized once
+    """
+    mapping = {name: player_id(name) for name in names.unique()}
+    return pd.Index(names.map(mapping), name=INDEX_NAME)
+
+def disambiguated_ids(ids: pd.Index, teams: pd.Series, games: pd.Series = None) -> pd.Index:
+    """
+    Returns ids where different players sharing a name get the ids name, name-2, name-3... in the order of the page. The rows of
+    a traded player are a TOT row followed by one row per team, they keep the same id. With games, the team rows of a traded
+    player end once they add up to the games of the TOT row.
+    """
+    duplicated = ids.duplicated(keep=False)
+    if not duplicated.any():
+        return ids
+
+    names, teams = ids.to_numpy(dtype=object), teams.to_numpy()
+    games = games.to_numpy() if games is not None else None
+    values = names.copy()
+    players, last_row, games_left = {}, -2, 0
+    for row in duplicated.nonzero()[0]:
+        name = names[row]
+        # Team rows follow the TOT row of their player, any other repeated name is another player
+        if teams[row] == 'TOT' or not (games_left > 0 and row == last_row + 1 and names[last_row] == name):
+            players[name] = players.get(name, 0) + 1
+            games_left = (games[row] if games is not None else float('inf')) if teams[row] == 'TOT' else 0
+        elif games is not None:
+            games_left -= games[row]
+        last_row = row
+        if players[name] > 1:
+            values[row] = f'{name}-{players[name]}'
+    return pd.Index(values, name=ids.name)
+
+def index_by_player(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sets the PlayerID index on a stat table, players sharing a name within the table are told apart when it has a Tm column
+    """
+    ids = player_ids(df['Player'])
+    df.index = disambiguated_ids(ids, df['Tm'], df.get('G')) if 'Tm' in df else ids
+    return df
+
+def build_player_index(df: pd.DataFrame, season: int) -> pd.DataFrame:
+    """
+    Returns the canonical players of a season, one row per PlayerID with the name, position and team used across stat types
+    """
+    players = df.loc[~df.index.duplicated(), ['Player', 'Pos', 'Tm']].copy()
+    players['Season'] = season
+    return players
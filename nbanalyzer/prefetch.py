@@ -0,0 +1,43 @@
+"""
+Background loading of the tables a season page needs, so they download concurrently while the first table is shown
+"""
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from .basketball_reference_api import load_players_data, load_mvp_voting, stat_type_header
+
+# Tables read by the season summary sections, the selected stat table is loaded by the page itself
+SEASON_STAT_TYPES = ['per_game', 'per_poss', 'advanced', 'play-by-play']
+PREFETCH_WORKERS = 4
+
+_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix='nbanalyzer-prefetch')
+_pending = {}
+_lock = threading.Lock()
+
+def _load(func, *args) -> None:
+    # Tables land in the warehouse, futures do not keep them alive
+    func(*args)
+
+def _done(key: tuple, future: Future) -> None:
+    with _lock:
+        if _pending.get(key) is future:
+            del _pending[key]
+
+def _submit(key: tuple, func, *args) -> Future:
+    with _lock:
+        future = _pending.get(key)
+        if future is None:
+            future = _executor.submit(_load, func, *args)
+            _pending[key] = future
+            # Finished loads are forgotten, a later call loads the table again when a refresh made it stale
+            future.add_done_callback(lambda future: _done(key, future))
+        return future
+
+def prefetch_season(season: int, stat_types: list[str] = SEASON_STAT_TYPES, mvp: bool = True) -> list[Future]:
+    """
+    Starts loading the tables of a season into the warehouse on the worker pool and returns their futures, tables still loading
+    are not submitted again and tables already in the warehouse are only read back
+    """
+    futures = [_submit((season, stat_type), load_players_data, season, stat_type, stat_type_header(stat_type)) for stat_type in stat_types]
+    if mvp:
+        futures.append(_submit((season, 'mvp'), load_mvp_voting, season))
+    return futures
@@ -0,0 +1,159 @@
+"""
+Filters over stat tables. A TableIndex is built once per table with a bitmap of the rows of every team, position and season, the
+players sorted by PlayerID for prefix search and the numeric columns as arrays. Queries are compiled once and evaluated against
+any index, so filtering costs a few vectorized passes whatever the number of seasons in the table.
+"""
+from typing import NamedTuple, Optional
+import numpy as np
+import pandas as pd
+from . import warehouse
+from .basketball_reference_api import get_players_data, get_advanced_metrics, stat_type_header
+from .caching import cache
+from .compact import concat_frames
+from .players import player_id
+from .views import shallow
+
+# Columns with a bitmap per value
+INDEXED_COLUMNS = ['Tm', 'Pos', 'Season']
+
+class TableIndex:
+    """
+    Prebuilt indexes of a stat table, the table itself is only read when a result is taken from it
+    """
+    def __init__(self, table: pd.DataFrame):
+        self.table = table
+        self.columns = table.columns
+        self.bitmaps = {}
+        for col in INDEXED_COLUMNS:
+            if col in table:
+                codes, values = pd.factorize(table[col].to_numpy(), sort=True)
+                self.bitmaps[col] = {value: codes == code for code, value in enumerate(values.tolist())}
+        ids = table.index.to_numpy().astype(str)
+        self.id_order = np.argsort(ids, kind='stable')
+        self.sorted_ids = ids[self.id_order]
+        self._arrays = {}
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def values(self, col: str) -> list:
+        """
+        Returns the sorted distinct values of an indexed column, e.g. the teams for a filter widget
+        """
+        return list(self.bitmaps.get(col, {}))
+
+    @property
+    def teams(self) -> list:
+        return self.values('Tm')
+
+    def array(self, col: str) -> np.ndarray:
+        if col not in self._arrays:
+            self._arrays[col] = self.table[col].to_numpy(dtype=float, na_value=np.nan)
+        return self._arrays[col]
+
+    def any_of(self, col: str, selected) -> Optional[np.ndarray]:
+        """
+        Returns the mask of the rows whose col is one of selected, None when every value is selected
+        """
+        bitmaps = self.bitmaps[col]
+        selected = set(selected)
+        if selected.issuperset(bitmaps):
+            return None
+        # The smaller side of the selection is combined, all 30 teams but one costs a single bitmap
+        included = [bitmap for value, bitmap in bitmaps.items() if value in selected]
+        if len(included) <= len(bitmaps) / 2:
+            return np.logical_or.reduce(included) if included else np.zeros(len(self), dtype=bool)
+        excluded = [bitmap for value, bitmap in bitmaps.items() if value not in selected]
+        return ~np.logical_or.reduce(excluded)
+
+    def prefix(self, prefix: str) -> np.ndarray:
+        """
+        Returns the mask of the players whose name starts with prefix, ignoring case and accents
+        """
+        key = player_id(prefix)
+        # Ids only hold lowercase letters, digits and hyphens, all sorted before '~'
+        start, end = np.searchsorted(self.sorted_ids, [key, key + '~'])
+        mask = np.zeros(len(self), dtype=bool)
+        mask[self.id_order[start:end]] = True
+        return mask
+
+class Query(NamedTuple):
+    """
+    Compiled filter, independent of any table so it can be run against the index of every season
+    """
+    members: tuple = ()  # (column, frozenset of values)
+    ranges: tuple = ()  # (column, minimum or None, maximum or None)
+    name_prefix: str = ''
+
+    def mask(self, index: TableIndex) -> np.ndarray:
+        mask = np.ones(len(index), dtype=bool)
+        for col, selected in self.members:
+            if col in index.bitmaps:
+                members = index.any_of(col, selected)
+                if members is not None:
+                    mask &= members
+        for col, minimum, maximum in self.ranges:
+            values = index.array(col)
+            if minimum is not None:
+                mask &= values >= minimum
+            if maximum is not None:
+                mask &= values <= maximum
+        if self.name_prefix:
+            mask &= index.prefix(self.name_prefix)
+        return mask
+
+    def positions(self, index: TableIndex) -> np.ndarray:
+        """
+        Returns the row numbers of the matching rows
+        """
+        return np.flatnonzero(self.mask(index))
+
+    def run(self, index: TableIndex, columns: list[str] = None) -> pd.DataFrame:
+        """
+        Returns the matching rows with the selected columns. When every row matches, the result is a new frame over the cached
+        values, which stay read-only, otherwise the matching rows are copied.
+        """
+        rows = self.positions(index)
+        table = index.table if columns is None else index.table[columns]
+        return shallow(table) if len(rows) == len(index) else table.iloc[rows]
+
+def compile_query(teams=None, positions=None, seasons=None, ranges: dict = None, min_games: float = None,
+                  min_minutes: float = None, name_prefix: str = '') -> Query:
+    """
+    Compiles a filter, None leaves a criterion out. ranges maps columns to (minimum, maximum) bounds, either may be None.
+    """
+    members = tuple((col, frozenset(values)) for col, values in (('Tm', teams), ('Pos', positions), ('Season', seasons))
+                    if values is not None)
+    bounds = dict(ranges or {})
+    if min_games:
+        bounds['G'] = (min_games, None)
+    if min_minutes:
+        bounds['MP'] = (min_minutes, None)
+    return Query(members, tuple((col, minimum, maximum) for col, (minimum, maximum) in bounds.items()), name_prefix.strip())
+
+def get_table_index(season: int, stat_type: str) -> TableIndex:
+    """
+    Returns the index of a season's stat table, built once per version of the season
+    """
+    return _get_table_index(season, stat_type, warehouse.season_version(season))
+
+@cache(allow_output_mutation=True)
+def _get_table_index(season: int, stat_type: str, version: int) -> TableIndex:
+    if stat_type == 'advanced_box_score':
+        return TableIndex(get_advanced_metrics(season))
+    return TableIndex(get_players_data(season, stat_type, stat_type_header(stat_type)))
+
+def build_seasons_index(seasons, stat_type: str) -> TableIndex:
+    """
+    Returns the index of the stat tables of many seasons stacked with a Season column
+    """
+    tables = {season: get_table_index(season, stat_type).table for season in seasons}
+    stacked = concat_frames(tables, names=['Season', 'PlayerID']).reset_index(level='Season')
+    return TableIndex(stacked)
+
+def run_across(query: Query, seasons, stat_type: str, columns: list[str] = None) -> pd.DataFrame:
+    """
+    Runs a compiled query against the index of every season and stacks the results with a Season column
+    """
+    results = {season: query.run(get_table_index(season, stat_type), columns) for season in seasons}
+    return concat_frames(results, names=['Season', 'PlayerID']).reset_index(level='Season')
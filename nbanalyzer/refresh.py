@@ -0,0 +1,224 @@
+"""
+Incremental refresh of a season in progress
+
+    python -m nbanalyzer.refresh --season 2022
+
+Fresh pages are compared with the stored tables by row hash and only the player rows that changed are applied. The advanced box
+score metrics are computed again for the affected players only, and percentiles only for the metrics whose values moved. Every
+refresh that changes a table bumps the season version stamp, the cached tables and figures of the season are keyed on it.
+"""
+import argparse
+import sys
+from typing import NamedTuple, Optional
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+from . import warehouse
+from .basketball_reference_api import (ADVANCED_BOX_SCORE_COLS, ADVANCED_METRIC_INPUTS, players_data_url, parse_players_data,
+                                       join_tables, league_average_efg, advanced_metrics_from)
+from .compact import FLOAT_DECIMALS, compact_frame, concat_frames
+from .fetch import Fetcher, default_fetcher
+from .ingest import PAGE_STAT_TYPES, table_params, parse_stats
+from .instrumentation import configure_from_env, count, logger, span
+from .percentiles import build_percentile_index
+from .players import build_player_index
+
+METRIC_COLS = ADVANCED_BOX_SCORE_COLS[3:]
+
+class TableChanges(NamedTuple):
+    changed: pd.Index  # PlayerIDs of changed or added rows
+    removed: pd.Index
+
+    def __bool__(self) -> bool:
+        return len(self.changed) > 0 or len(self.removed) > 0
+
+    @property
+    def players(self) -> pd.Index:
+        return self.changed.union(self.removed)
+
+NO_CHANGES = TableChanges(pd.Index([]), pd.Index([]))
+
+class RefreshedTable(NamedTuple):
+    previous: Optional[pd.DataFrame]
+    table: pd.DataFrame
+    changes: TableChanges
+
+def _normalized(values: pd.Series) -> pd.Series:
+    # Stored and parsed tables may be downcast to different dtypes, rows are hashed by value
+    if is_numeric_dtype(values.dtype):
+        return values.astype('float64').round(FLOAT_DECIMALS)
+    return values.astype(str)
+
+def row_hashes(df: pd.DataFrame) -> pd.Series:
+    """
+    Returns one hash of the values of each row, indexed like df
+    """
+    normalized = pd.DataFrame({col: _normalized(df[col]) for col in df.columns}, index=df.index)
+    return pd.util.hash_pandas_object(normalized, index=False)
+
+def diff_tables(previous: Optional[pd.DataFrame], table: pd.DataFrame) -> TableChanges:
+    """
+    Returns the rows of table that changed or were added since previous and the rows that were removed
+    """
+    if previous is None:
+        return TableChanges(table.index, pd.Index([]))
+    removed = previous.index.difference(table.index, sort=False)
+    if list(previous.columns) != list(table.columns) or not previous.index.is_unique or not table.index.is_unique:
+        return TableChanges(table.index, removed)
+
+    old, new = row_hashes(previous), row_hashes(table)
+    common = new.index.intersection(old.index, sort=False)
+    changed = common[old.loc[common].to_numpy() != new.loc[common].to_numpy()]
+    return TableChanges(changed.append(new.index.difference(old.index, sort=False)), removed)
+
+def apply_changes(previous: Optional[pd.DataFrame], table: pd.DataFrame, changes: TableChanges) -> pd.DataFrame:
+    """
+    Returns previous with the changed rows of table applied and its removed rows dropped, in the row order of table
+    """
+    if previous is None or len(changes.changed) == len(table):
+        return table
+    kept = previous.drop(index=changes.players.intersection(previous.index))
+    merged = concat_frames([kept, table.loc[changes.changed]]).loc[table.index]
+    return compact_frame(merged)[0]
+
+def _read(season: int, table: str, **params) -> Optional[pd.DataFrame]:
+    df = warehouse.read_table(season, table, **params)
+    return None if df is None else compact_frame(df)[0]
+
+def refresh_table(season: int, stat_type: str, fetcher: Fetcher = None, base_url: str = None) -> RefreshedTable:
+    """
+    Downloads a stat table again and applies the rows that changed to the stored one
+    """
+    fetcher = fetcher or default_fetcher()
+    params = table_params(stat_type)
+    with warehouse.table_lock(season, stat_type, **params):
+        previous = _read(season, stat_type, **params)
+        validators = warehouse.load_validators(season, stat_type) if previous is not None else {}
+        page = fetcher.get(players_data_url(season, stat_type, base_url), validators.get('etag'), validators.get('last_modified'))
+        if page.not_modified:
+            warehouse.renew_table(season, stat_type, **params)
+            return RefreshedTable(previous, previous, NO_CHANGES)
+
+        table = parse_players_data(page.text, **params, stat_type=stat_type)
+        with span('diff', stat_type=stat_type):
+            changes = diff_tables(previous, table)
+        if changes:
+            table = apply_changes(previous, table, changes)
+            warehouse.store_table(season, stat_type, table, **params)
+        else:
+            table = previous
+            warehouse.renew_table(season, stat_type, **params)
+        warehouse.store_validators(season, stat_type, page.etag, page.last_modified)
+    count('refreshed_rows', len(changes.changed), stat_type=stat_type)
+    return RefreshedTable(previous, table, changes)
+
+def _stored_or_refreshed(season: int, stat_type: str, refreshed: dict) -> Optional[pd.DataFrame]:
+    if stat_type in refreshed:
+        return refreshed[stat_type].table
+    return _read(season, stat_type, **table_params(stat_type))
+
+def refresh_players(season: int, per_game: RefreshedTable) -> TableChanges:
+    """
+    Applies the changes of the per game table to the canonical players of the season
+    """
+    previous = _read(season, 'players')
+    if previous is not None and not per_game.changes:
+        return NO_CHANGES
+    players = build_player_index(per_game.table, season)
+    changes = diff_tables(previous, players)
+    if changes:
+        warehouse.store_table(season, 'players', apply_changes(previous, players, changes))
+    return changes
+
+def refresh_metrics(season: int, refreshed: dict, player_changes: TableChanges) -> list[str]:
+    """
+    Computes the advanced box score metrics of the affected players again and the percentiles of the metrics that changed,
+    returns the metrics whose percentiles were computed again
+    """
+    previous = _read(season, 'advanced_box_score')
+    per_game = _stored_or_refreshed(season, 'per_game', refreshed)
+    players = _read(season, 'players')
+    tables = {stat_type: _stored_or_refreshed(season, stat_type, refreshed) for stat_type in ADVANCED_METRIC_INPUTS}
+    if per_game is None or players is None or any(table is None for table in tables.values()):
+        return []
+
+    affected = player_changes.players
+    for stat_type in ADVANCED_METRIC_INPUTS:
+        if stat_type in refreshed:
+            affected = affected.union(refreshed[stat_type].changes.players)
+    # The league average eFG% enters the spacing of every player
+    efg = league_average_efg(per_game)
+    previous_per_game = refreshed['per_game'].previous if 'per_game' in refreshed else per_game
+    efg_changed = previous_per_game is None or not np.isclose(efg, league_average_efg(previous_per_game))
+    if previous is not None and affected.empty and not efg_changed:
+        return []
+
+    if previous is None or efg_changed:
+        metrics = advanced_metrics_from(join_tables(players, tables, ADVANCED_METRIC_INPUTS), efg)
+    else:
+        order = join_tables(players[[]], tables, {stat_type: [] for stat_type in ADVANCED_METRIC_INPUTS}).index
+        recomputed = players.loc[players.index.intersection(affected, sort=False)]
+        recomputed = advanced_metrics_from(join_tables(recomputed, tables, ADVANCED_METRIC_INPUTS), efg)
+        kept = previous.drop(index=previous.index.intersection(affected))
+        metrics = compact_frame(concat_frames([kept, recomputed]).loc[order])[0]
+
+    changes = diff_tables(previous, metrics)
+    if not changes:
+        return []
+    warehouse.store_table(season, 'advanced_box_score', metrics)
+
+    # Ranks move for the whole league when a value changes, but only in the metrics whose values changed
+    percentiles = _read(season, 'percentiles')
+    if percentiles is None or len(changes.removed) or not changes.changed.isin(previous.index).all():
+        stats = METRIC_COLS
+        percentiles = pd.DataFrame(index=metrics.index, columns=METRIC_COLS, dtype='float64')
+    else:
+        before = previous.loc[changes.changed, METRIC_COLS].to_numpy(dtype=float)
+        after = metrics.loc[changes.changed, METRIC_COLS].to_numpy(dtype=float)
+        stats = [col for col, moved in zip(METRIC_COLS, ~np.isclose(before, after, equal_nan=True).all(axis=0)) if moved]
+        percentiles = percentiles.reindex(metrics.index)
+    with span('metrics', metric='percentiles'):
+        percentiles[stats] = build_percentile_index(metrics, stats)
+    warehouse.store_table(season, 'percentiles', percentiles)
+    return stats
+
+def refresh_season(season: int = None, stats: list[str] = PAGE_STAT_TYPES, fetcher: Fetcher = None, base_url: str = None) -> dict:
+    """
+    Refreshes the tables of a season incrementally, the current season by default. Returns the number of changed rows of
+    every table and the season version, bumped when anything changed.
+    """
+    season = season or warehouse.current_season()
+    refreshed = {}
+    summary = {}
+    for stat_type in stats:
+        try:
+            refreshed[stat_type] = refresh_table(season, stat_type, fetcher, base_url)
+            summary[stat_type] = len(refreshed[stat_type].changes.changed) + len(refreshed[stat_type].changes.removed)
+        except Exception as e:
+            logger.error('FAILED %s %s: %s', season, stat_type, e)
+            summary[stat_type] = None
+
+    player_changes = refresh_players(season, refreshed['per_game']) if 'per_game' in refreshed else NO_CHANGES
+    summary['percentiles'] = len(refresh_metrics(season, refreshed, player_changes))
+
+    if any(summary[stat_type] for stat_type in stats) or player_changes:
+        summary['version'] = warehouse.bump_season_version(season)
+    else:
+        summary['version'] = warehouse.season_version(season)
+    return summary
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m nbanalyzer.refresh', description='Apply the latest changes of a season to the local warehouse')
+    parser.add_argument('--season', type=int, default=None, help='season to refresh, the current one by default')
+    parser.add_argument('--stats', default='all', help=f"'all' or a comma separated list of {', '.join(PAGE_STAT_TYPES)}")
+    parser.add_argument('--base-url', default=None, help='site to download from, e.g. a local stub server')
+    args = parser.parse_args(argv)
+    configure_from_env()
+
+    stats = [stat for stat in parse_stats(args.stats) if stat in PAGE_STAT_TYPES]
+    summary = refresh_season(args.season, stats, base_url=args.base_url)
+    print(', '.join(f'{state} {value}' for state, value in summary.items()))
+    return 1 if None in summary.values() else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
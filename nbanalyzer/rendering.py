@@ -0,0 +1,108 @@
+"""
+Rendering of large scatter plots. Above WEBGL_THRESHOLD points markers are drawn with WebGL instead of SVG, above MAX_POINTS
+points crowded regions are thinned out while sparse regions and highlighted players are kept whole, and coordinates are rounded
+so the figure sent to the browser stays small.
+"""
+from __future__ import annotations
+import os
+from typing import TYPE_CHECKING
+import numpy as np
+import pandas as pd
+from .compact import FLOAT_DECIMALS
+from .players import player_id, player_ids
+
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
+
+WEBGL_THRESHOLD = int(os.environ.get('NBANALYZER_WEBGL_THRESHOLD', 1000))
+# 0 keeps every point
+MAX_POINTS = int(os.environ.get('NBANALYZER_MAX_POINTS', 5000))
+DENSITY_BINS = 64
+HIGHLIGHT_COLOR = '#ffffff'
+
+def render_mode(points: int) -> str:
+    """
+    Returns the plotly express render mode of a scatter plot of points markers
+    """
+    return 'webgl' if points > WEBGL_THRESHOLD else 'svg'
+
+def scatter_trace(points: int):
+    """
+    Returns the scatter trace type to draw points markers with
+    """
+    import plotly.graph_objects as go
+    return go.Scattergl if points > WEBGL_THRESHOLD else go.Scatter
+
+def highlighted(df: pd.DataFrame, players: list[str]) -> np.ndarray:
+    """
+    Returns the mask of the rows of the selected players, a list or a series of names. Names are compared by PlayerID, so
+    'Larry Bird*' on a stats page matches 'Larry Bird' from the mvp voting.
+    """
+    if players is None or len(players) == 0:
+        return np.zeros(len(df), dtype=bool)
+    return player_ids(df['Player']).isin({player_id(player) for player in players})
+
+def _bins(values: np.ndarray) -> np.ndarray:
+    finite = values[np.isfinite(values)]
+    if not len(finite) or finite.min() == finite.max():
+        return np.zeros(len(values), dtype=np.int64)
+    scaled = (values - finite.min()) / (finite.max() - finite.min()) * (DENSITY_BINS - 1)
+    return np.nan_to_num(scaled, nan=0).astype(np.int64)
+
+def downsample(df: pd.DataFrame, x: str, y: str, keep: np.ndarray = None, max_points: int = None) -> pd.DataFrame:
+    """
+    Returns at most max_points rows of df, every cell of a DENSITY_BINS x DENSITY_BINS grid over (x, y) keeps up to the same
+    number of points so outliers survive and dense clusters are thinned. Rows in keep are always returned, alone when there are
+    more of them than max_points.
+    """
+    max_points = MAX_POINTS if max_points is None else max_points
+    if not max_points or len(df) <= max_points:
+        return df
+    keep = np.zeros(len(df), dtype=bool) if keep is None else keep
+
+    cells = _bins(df[x].to_numpy(dtype=float)) * DENSITY_BINS + _bins(df[y].to_numpy(dtype=float))
+    counts = np.bincount(cells[~keep], minlength=DENSITY_BINS * DENSITY_BINS)
+    budget = max(max_points - keep.sum(), 0)
+    # Largest number of points per cell that fits the budget
+    low, high = 0, counts.max()
+    while low < high:
+        cap = (low + high + 1) // 2
+        if np.minimum(counts, cap).sum() <= budget:
+            low = cap
+        else:
+            high = cap - 1
+
+    # Points of a cell are taken in a fixed random order so thinning does not favour the top of the table
+    order = np.random.default_rng(0).permutation(len(df))
+    rank = np.empty(len(df), dtype=np.int64)
+    rank[order] = pd.Series(cells[order]).groupby(cells[order]).cumcount().to_numpy()
+    return df[keep | (rank < low)]
+
+def add_highlights(fig: go.Figure, df: pd.DataFrame, players: list[str], x: str, y: str) -> go.Figure:
+    """
+    Draws the selected players on top of the figure with their names
+    """
+    import plotly.graph_objects as go
+    selected = df[highlighted(df, players)]
+    if len(selected):
+        fig.add_trace(go.Scatter(x=selected[x], y=selected[y], mode='markers+text', name='Highlighted',
+                                 text=selected['Player'].astype(str), textposition='top center',
+                                 marker=dict(color=HIGHLIGHT_COLOR, size=9, line=dict(width=1, color='black'))))
+    return fig
+
+def _rounded(values):
+    if values is None:
+        return None
+    array = np.asarray(values)
+    return np.round(array.astype(float), FLOAT_DECIMALS) if array.dtype.kind in 'iuf' else values
+
+def compact_figure(fig: go.Figure) -> go.Figure:
+    """
+    Rounds the coordinates of every scatter trace, full float precision makes up most of a large figure's JSON
+    """
+    import plotly.graph_objects as go
+    for trace in fig.data:
+        if isinstance(trace, (go.Scatter, go.Scattergl)):
+            trace.x = _rounded(trace.x)
+            trace.y = _rounded(trace.y)
+    return fig
@@ -0,0 +1,128 @@
+"""
+Headless batch rendering of a static report, without Streamlit
+
+    python -m nbanalyzer.report --seasons 1980-2022 --output report --workers 4
+
+Every season is rendered in its own process: its stat tables, advanced box score metrics and percentiles are exported next to
+its figures as self-contained HTML and PNG files, and an index.html links them. Meant to be run nightly so serving the results
+only takes a static file server.
+"""
+import argparse
+import html
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from . import data_visualization as viz
+from .basketball_reference_api import (FIRST_PLAY_BY_PLAY_SEASON, get_players_data, get_mvp_voting, get_advanced_metrics, get_percentile_index,
+                                     published_stat_types, stat_type_header)
+from .export import EXPORT_FORMATS, export_file_name, write_table
+from .history import FIRST_THREE_POINT_SEASON
+from .ingest import PAGE_STAT_TYPES, parse_seasons
+from .instrumentation import configure_from_env, logger
+
+BEST_PLAYERS = 5
+
+def season_stat_types(season: int) -> list[str]:
+    return published_stat_types(season, PAGE_STAT_TYPES)
+
+def best_players(season: int) -> list[str]:
+    """
+    Returns the top mvp candidates of a season, or no one when the voting is not published yet
+    """
+    try:
+        return list(get_mvp_voting(season, BEST_PLAYERS))
+    except Exception:
+        return []
+
+def season_figures(season: int) -> dict:
+    """
+    Returns the functions drawing the figures of a season by file name
+    """
+    figures = {'heatmap': lambda: viz.draw_intercorrelation_heatmap(season),
+               'scoring': lambda: viz.gen_scoring_efficiency_plot(season, best_players(season))}
+    if season >= FIRST_THREE_POINT_SEASON:
+        figures['shooting'] = lambda: viz.gen_shooting_efficiency_plot(season)
+        figures['playmaking'] = lambda: viz.gen_playmaking_plot(season)
+    if season >= FIRST_PLAY_BY_PLAY_SEASON:
+        figures['impact'] = lambda: viz.gen_on_off_plot(season, best_players(season))
+    return figures
+
+def _write(path: str, write) -> str:
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, path)
+    return os.path.basename(path)
+
+def render_season(season: int, output: str, fmt: str = 'parquet') -> dict:
+    """
+    Renders the tables and figures of a season into output/season, returns the written files by kind
+    """
+    directory = os.path.join(output, str(season))
+    os.makedirs(directory, exist_ok=True)
+    files = {'tables': [], 'figures': []}
+
+    tables = {stat_type: lambda stat_type=stat_type: get_players_data(season, stat_type, stat_type_header(stat_type))
+              for stat_type in season_stat_types(season)}
+    tables['advanced_box_score'] = lambda: get_advanced_metrics(season)
+    tables['percentiles'] = lambda: get_percentile_index(season)
+    for name, load in tables.items():
+        table = load()
+        files['tables'].append(_write(os.path.join(directory, export_file_name(name, fmt)), lambda f: write_table(table, fmt, f)))
+
+    for name, draw in season_figures(season).items():
+        figure = draw()
+        if isinstance(figure, bytes):
+            files['figures'].append(_write(os.path.join(directory, f'{name}.png'), lambda f: f.write(figure)))
+        else:
+            html_page = figure.to_html(include_plotlyjs='cdn', full_html=True)
+            files['figures'].append(_write(os.path.join(directory, f'{name}.html'), lambda f: f.write(html_page.encode())))
+    return files
+
+def write_index(output: str, rendered: dict) -> None:
+    """
+    Writes output/index.html linking the files of every rendered season
+    """
+    rows = []
+    for season, files in sorted(rendered.items(), reverse=True):
+        links = ' '.join(f'<a href="{season}/{html.escape(name)}">{html.escape(name)}</a>' for name in files['figures'] + files['tables'])
+        rows.append(f'<li><b>{season}</b> {links}</li>')
+    page = f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>NBA Stats Explorer</title></head>\n' \
+           f'<body><h1>NBA Stats Explorer</h1><ul>\n' + '\n'.join(rows) + '\n</ul></body></html>\n'
+    _write(os.path.join(output, 'index.html'), lambda f: f.write(page.encode()))
+
+def render_report(seasons: list[int], output: str, workers: int = None, fmt: str = 'parquet') -> dict:
+    """
+    Renders every season on a process pool, returns the files of each rendered season and the seasons that failed
+    """
+    os.makedirs(output, exist_ok=True)
+    rendered, failed = {}, []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(render_season, season, output, fmt): season for season in seasons}
+        for future in as_completed(futures):
+            season = futures[future]
+            try:
+                rendered[season] = future.result()
+            except Exception as e:
+                logger.error('FAILED %s: %s', season, e)
+                failed.append(season)
+    write_index(output, rendered)
+    return {'rendered': rendered, 'failed': sorted(failed)}
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m nbanalyzer.report', description='Render the tables and figures of many seasons into a static report')
+    parser.add_argument('--seasons', default='1977-2022', help="seasons to render, e.g. '1977-2022' or '2020,2022'")
+    parser.add_argument('--output', default='report', help='directory of the report')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes, one per cpu by default')
+    parser.add_argument('--format', default='parquet', choices=list(EXPORT_FORMATS), help='file format of the tables')
+    args = parser.parse_args(argv)
+    configure_from_env()
+
+    summary = render_report(parse_seasons(args.seasons), args.output, args.workers, args.format)
+    print(f"{len(summary['rendered'])} seasons rendered, {len(summary['failed'])} failed")
+    if summary['failed']:
+        print(f"Failed: {', '.join(map(str, summary['failed']))}", file=sys.stderr)
+    return 1 if summary['failed'] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
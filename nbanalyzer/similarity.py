@@ -0,0 +1,88 @@
+"""
+Cross season player similarity. Advanced box score metrics and per 100 possessions stats are z-scored within each season and held
+in one contiguous float32 matrix, nearest neighbours are found with batched distance computations.
+"""
+import numpy as np
+import pandas as pd
+from .caching import cache
+from .compact import concat_frames
+from .basketball_reference_api import ADVANCED_BOX_SCORE_COLS, get_advanced_metrics, get_players_data
+
+PER_100_FEATURES = ['TRB', 'AST', 'STL', 'BLK', 'TOV', '3PA', 'FTA']
+SIMILARITY_FEATURES = ADVANCED_BOX_SCORE_COLS[3:] + [f'{col} per 100' for col in PER_100_FEATURES]
+
+class SimilarityIndex:
+    """
+    Nearest neighbour index over player seasons, keys holds the Season, PlayerID and Player of each matrix row
+    """
+    def __init__(self, keys: pd.DataFrame, matrix: np.ndarray):
+        self.keys = keys.reset_index(drop=True)
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self.squared_norms = np.einsum('ij,ij->i', self.matrix, self.matrix)
+        self._rows = {key: row for row, key in enumerate(zip(self.keys['Season'], self.keys['PlayerID']))}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def row(self, season: int, player_id: str) -> int:
+        return self._rows[(season, player_id)]
+
+    def search(self, vectors: np.ndarray, k: int = 10, exclude: np.ndarray = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the rows and distances of the k nearest player seasons of each query vector, closest first.
+        exclude holds one row per query that is left out of its results, e.g. the queried player season itself.
+        """
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        k = min(k, len(self) - (exclude is not None))
+        # |x - q|^2 = |x|^2 + |q|^2 - 2 x.q for every pair in a single matrix product
+        distances = self.squared_norms[None, :] - 2 * vectors @ self.matrix.T + np.einsum('ij,ij->i', vectors, vectors)[:, None]
+        if exclude is not None:
+            distances[np.arange(len(vectors)), exclude] = np.inf
+        rows = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        nearest = np.take_along_axis(distances, rows, axis=1)
+        order = np.argsort(nearest, axis=1)
+        rows = np.take_along_axis(rows, order, axis=1)
+        return rows, np.sqrt(np.maximum(np.take_along_axis(nearest, order, axis=1), 0))
+
+    def similar_players(self, season: int, player_id: str, k: int = 10) -> pd.DataFrame:
+        """
+        Returns the k player seasons most similar to the player's season, from any season
+        """
+        row = self.row(season, player_id)
+        rows, distances = self.search(self.matrix[row], k, exclude=np.array([row]))
+        similar = self.keys.iloc[rows[0]].copy()
+        similar['Distance'] = distances[0]
+        return similar.reset_index(drop=True)
+
+def zscore_by_season(features: pd.DataFrame, seasons: pd.Series) -> pd.DataFrame:
+    """
+    Standardizes every feature within its season so players are compared to their own league
+    """
+    grouped = features.groupby(seasons.to_numpy())
+    std = grouped.transform('std', ddof=0).replace(0, 1)
+    return ((features - grouped.transform('mean')) / std).fillna(0)
+
+def season_features(season: int) -> pd.DataFrame:
+    """
+    Returns the similarity features of every player of a season indexed by PlayerID
+    """
+    metrics = get_advanced_metrics(season)
+    per_100 = get_players_data(season, 'per_poss').reindex(columns=PER_100_FEATURES)
+    per_100.columns = SIMILARITY_FEATURES[len(ADVANCED_BOX_SCORE_COLS[3:]):]
+    return metrics[['Player'] + ADVANCED_BOX_SCORE_COLS[3:]].join(per_100, how='inner')
+
+def build_similarity_index(frames: dict) -> SimilarityIndex:
+    """
+    Builds the index from {season: season_features(season)} frames
+    """
+    stacked = concat_frames(frames, names=['Season', 'PlayerID']).reset_index()
+    features = stacked[SIMILARITY_FEATURES].astype(np.float64)
+    matrix = zscore_by_season(features, stacked['Season']).to_numpy(dtype=np.float32)
+    return SimilarityIndex(stacked[['Season', 'PlayerID', 'Player']], matrix)
+
+@cache(allow_output_mutation=True)
+def get_similarity_index(first_season: int, last_season: int) -> SimilarityIndex:
+    """
+    Returns the similarity index of every player season between first_season and last_season
+    """
+    return build_similarity_index({season: season_features(season) for season in range(first_season, last_season + 1)})
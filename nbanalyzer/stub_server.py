@@ -0,0 +1,117 @@
+"""
+Local HTTP server answering like basketball-reference from a fixture store, for offline work and load tests
+
+    python -m nbanalyzer.stub_server --fixtures benchmarks/fixtures --port 8765
+    NBANALYZER_BASE_URL=http://localhost:8765/ streamlit run nba_app.py
+
+Pages carry ETag and Last-Modified headers and conditional requests are answered with 304. Latency and a rate limit answering
+429 like the site can be added to rehearse slow or throttled upstreams.
+"""
+import argparse
+import os
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .fetch import FixtureStore, FIXTURES_DIR, page_etag
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple, store: FixtureStore, latency: float = 0., rate_limit: float = None):
+        super().__init__(address, StubHandler)
+        self.store = store
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.requests = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+        self._allowance = rate_limit or 0.
+        self._last_request = time.monotonic()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def admit(self) -> bool:
+        """
+        Counts a request and returns False when it goes over the rate limit, a token bucket refilled rate_limit times per second
+        """
+        with self._lock:
+            self.requests += 1
+            if not self.rate_limit:
+                return True
+            now = time.monotonic()
+            self._allowance = min(self.rate_limit, self._allowance + (now - self._last_request) * self.rate_limit)
+            self._last_request = now
+            if self._allowance < 1:
+                self.throttled += 1
+                return False
+            self._allowance -= 1
+            return True
+
+class StubHandler(BaseHTTPRequestHandler):
+    server: StubServer
+
+    def do_GET(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if not self.server.admit():
+            self.send_response(429)
+            self.send_header('Retry-After', '1')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        try:
+            path = self.server.store.path(self.path)
+            with open(path, 'rb') as f:
+                body = f.read()
+        except (ValueError, FileNotFoundError):
+            self.send_error(404)
+            return
+
+        etag = page_etag(body.decode('utf-8'))
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', formatdate(os.path.getmtime(path), usegmt=True))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def serve(fixtures: str = FIXTURES_DIR, port: int = 0, host: str = '127.0.0.1', latency: float = 0., rate_limit: float = None) -> StubServer:
+    """
+    Starts a stub server on a daemon thread and returns it, port 0 picks a free port, see base_url
+    """
+    server = StubServer((host, port), FixtureStore(fixtures), latency, rate_limit)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main(argv: list[str] = None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m nbanalyzer.stub_server', description='Serve recorded basketball reference pages locally')
+    parser.add_argument('--fixtures', default=FIXTURES_DIR, help='directory of recorded pages')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0., help='seconds added to every response')
+    parser.add_argument('--rate-limit', type=float, default=None, help='requests per second before answering 429')
+    args = parser.parse_args(argv)
+
+    server = StubServer((args.host, args.port), FixtureStore(args.fixtures), args.latency, args.rate_limit)
+    print(f'Serving {args.fixtures} on {server.base_url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
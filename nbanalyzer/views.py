@@ -0,0 +1,43 @@
+"""
+Read-only access to cached tables. Cached frames are shared by every rerun and user, so their arrays are frozen and plots build
+the few derived columns they need instead of copying whole tables.
+"""
+import numpy as np
+import pandas as pd
+
+PER_75_SCALE = .75
+
+def _read_only(array) -> None:
+    # Views share memory with their base, the base has to be frozen as well
+    while isinstance(array, np.ndarray):
+        array.flags.writeable = False
+        array = array.base
+
+def freeze(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Makes the values of a cached frame read-only, writing into them raises instead of silently changing the cache
+    """
+    for col in df.columns:
+        values = df[col].array
+        _read_only(values.codes if isinstance(values, pd.Categorical) else getattr(values, '_ndarray', None))
+    return df
+
+def shallow(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns a new frame over the frozen values of a cached one, callers can add, replace or drop columns and rows of it without
+    changing the cache, no value is copied
+    """
+    return df.copy(deep=False)
+
+def per_75(values: pd.Series) -> pd.Series:
+    """
+    Returns per 100 possessions values scaled to 75 possessions
+    """
+    return values * PER_75_SCALE
+
+def min_attempts(df: pd.DataFrame, column: str, minimum: float, columns: list[str] = None) -> pd.DataFrame:
+    """
+    Returns the rows with at least minimum attempts, only the requested columns are taken from the cached frame
+    """
+    mask = df[column].to_numpy() >= minimum
+    return df.loc[mask, columns if columns is not None else df.columns]
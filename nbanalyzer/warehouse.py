@@ -0,0 +1,143 @@
+import json
+import os
+import threading
+import time
+from datetime import date
+from typing import Optional
+import pandas as pd
+from .instrumentation import count, size, span
+
+WAREHOUSE_DIR = os.environ.get('NBANALYZER_WAREHOUSE', os.path.join(os.path.expanduser('~'), '.cache', 'nbanalyzer'))
+# Bumped whenever the layout of stored tables changes so older files are not read back
+FORMAT_VERSION = 5
+CURRENT_SEASON_TTL = float(os.environ.get('NBANALYZER_CURRENT_SEASON_TTL', 6 * 60 * 60))
+
+def current_season(today: Optional[date] = None) -> int:
+    """
+    Returns the season currently being played, seasons are named after the year they end in
+    """
+    today = today or date.today()
+    return today.year + 1 if today.month >= 10 else today.year
+
+_table_locks = {}
+_table_locks_lock = threading.Lock()
+
+def season_dir(season: int) -> str:
+    return os.path.join(WAREHOUSE_DIR, f'v{FORMAT_VERSION}', str(season))
+
+def table_path(season: int, table: str, **params) -> str:
+    """
+    Returns the warehouse file holding a table, every parameter that changes the table content is part of its name
+    """
+    suffix = ''.join(f'_{key}={int(value) if isinstance(value, bool) else value}' for key, value in sorted(params.items()))
+    return os.path.join(season_dir(season), f'{table}{suffix}.parquet')
+
+def table_lock(season: int, table: str, **params) -> threading.Lock:
+    """
+    Returns the lock serializing the loads of a table within the process, so it is downloaded once
+    """
+    path = table_path(season, table, **params)
+    with _table_locks_lock:
+        return _table_locks.setdefault(path, threading.Lock())
+
+def is_fresh(season: int, path: str) -> bool:
+    """
+    Past seasons never change once stored, the current season expires after CURRENT_SEASON_TTL seconds
+    """
+    if not os.path.exists(path):
+        return False
+    if season < current_season():
+        return True
+    return time.time() - os.path.getmtime(path) < CURRENT_SEASON_TTL
+
+def load_table(season: int, table: str, columns: list[str] = None, **params) -> Optional[pd.DataFrame]:
+    """
+    Returns the stored table or None when it is missing or stale, only the selected columns are read when columns is given
+    """
+    path = table_path(season, table, **params)
+    if not is_fresh(season, path):
+        count('cache_miss', cache='warehouse', table=table)
+        return None
+    count('cache_hit', cache='warehouse', table=table)
+    return _read(path, table, columns)
+
+def read_table(season: int, table: str, **params) -> Optional[pd.DataFrame]:
+    """
+    Returns the stored table even if it is stale, or None when it is missing
+    """
+    path = table_path(season, table, **params)
+    if not os.path.exists(path):
+        return None
+    return _read(path, table)
+
+def _read(path: str, table: str, columns: list[str] = None) -> pd.DataFrame:
+    size('payload', os.path.getsize(path), stage='warehouse')
+    with span('warehouse_read', table=table):
+        return pd.read_parquet(path, columns=columns)
+
+def store_table(season: int, table: str, df: pd.DataFrame, **params) -> None:
+    """
+    Writes a table to the warehouse, the file is replaced atomically so concurrent readers never see partial writes
+    """
+    path = table_path(season, table, **params)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # Columns left as text by the numeric coercion may still hold the 0 used to fill blanks
+    df = df.copy(deep=False)
+    for col in df.columns[df.dtypes == object]:
+        df[col] = df[col].astype(str)
+
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    df.to_parquet(tmp_path)
+    os.replace(tmp_path, path)
+
+def renew_table(season: int, table: str, **params) -> None:
+    """
+    Marks a stored table as fresh again, used when the source page did not change
+    """
+    path = table_path(season, table, **params)
+    if os.path.exists(path):
+        os.utime(path)
+
+def load_validators(season: int, page: str) -> dict:
+    """
+    Returns the ETag and Last-Modified headers saved for a source page
+    """
+    path = os.path.join(season_dir(season), f'{page}.validators.json')
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def store_validators(season: int, page: str, etag: Optional[str], last_modified: Optional[str]) -> None:
+    path = os.path.join(season_dir(season), f'{page}.validators.json')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'etag': etag, 'last_modified': last_modified}, f)
+
+def _version_path(season: int) -> str:
+    return os.path.join(season_dir(season), 'version')
+
+def season_version(season: int) -> int:
+    """
+    Returns the version stamp of a season, bumped every time a refresh changes one of its tables
+    """
+    try:
+        with open(_version_path(season)) as f:
+            return int(f.read())
+    except (FileNotFoundError, ValueError):
+        return 0
+
+def bump_season_version(season: int) -> int:
+    """
+    Increments the version stamp of a season so cached views of it are rebuilt, returns the new version
+    """
+    with table_lock(season, 'version'):
+        version = season_version(season) + 1
+        path = _version_path(season)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(str(version))
+        os.replace(tmp_path, path)
+    return version
@@ -0,0 +1,15 @@
+"""
+Tests run offline: pages are read from the recorded fixtures of benchmarks/fixtures into a throwaway warehouse
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, 'benchmarks', 'fixtures')
+
+# The library reads its settings when imported, so they are set before any test module imports it
+os.environ['NBANALYZER_BASE_URL'] = os.path.join(FIXTURES, '')
+os.environ['NBANALYZER_WAREHOUSE'] = tempfile.mkdtemp(prefix='nbanalyzer-tests-')
+os.environ['NBANALYZER_FETCH_MODE'] = 'live'
+sys.path.insert(0, ROOT)
@@ -0,0 +1,53 @@
+import pytest
+from conftest import FIXTURES, ROOT
+from nbanalyzer import basketball_reference_api, prefetch, warehouse
+from nbanalyzer.stub_server import serve
+
+pytest.importorskip('streamlit.testing.v1')
+from streamlit.testing.v1 import AppTest
+
+TIMEOUT_SECONDS = 120
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    server = serve(FIXTURES)
+    # The app downloads every page from the stub server into an empty warehouse
+    monkeypatch.setattr(basketball_reference_api, 'BASE_URL', server.base_url)
+    monkeypatch.setattr(warehouse, 'WAREHOUSE_DIR', str(tmp_path))
+    monkeypatch.chdir(ROOT)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def run(at: AppTest) -> AppTest:
+    at.run(timeout=TIMEOUT_SECONDS)
+    assert not at.exception, at.exception[0].message
+    return at
+
+@pytest.mark.parametrize('season, sections', [
+    (1990, ['MVP', 'scoring plot', 'shooting plot', 'playmaking plot']),
+    (2022, ['scoring plot', 'impact plot', 'Player Finder']),
+])
+def test_app_session(server, season, sections):
+    at = run(AppTest.from_file(f'{ROOT}/nba_app.py', default_timeout=TIMEOUT_SECONDS))
+    at.sidebar.selectbox[0].set_value(season)
+    run(at)
+    assert f'{season} Season Summary' in [header.value for header in at.header]
+    for section in sections:
+        at.checkbox(key=f'show {section}').check()
+        run(at)
+    assert server.requests > 0
+    if 'MVP' in sections:
+        assert any('Magic Johnson' in markdown.value for markdown in at.markdown)
+
+def test_season_is_prefetched_once_per_session(server, monkeypatch):
+    prefetched = []
+    monkeypatch.setattr(prefetch, 'prefetch_season', lambda season, *args, **kwargs: prefetched.append(season))
+    at = run(AppTest.from_file(f'{ROOT}/nba_app.py', default_timeout=TIMEOUT_SECONDS))
+    at.checkbox(key='show heatmap').check()
+    run(at)
+    at.sidebar.selectbox[0].set_value(1990)
+    run(at)
+    at.sidebar.selectbox[0].set_value(2022)
+    run(at)
+    assert prefetched == [2022, 1990]
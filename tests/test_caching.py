@@ -0,0 +1,18 @@
+from nbanalyzer import caching
+
+def test_headless_cache_is_bounded(monkeypatch):
+    monkeypatch.delitem(caching.sys.modules, 'streamlit', raising=False)
+    calls = []
+
+    @caching.cache
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    for x in range(caching.CACHE_ENTRIES + 1):
+        assert square(x) == x * x
+    assert square(caching.CACHE_ENTRIES) == caching.CACHE_ENTRIES ** 2
+    assert len(calls) == caching.CACHE_ENTRIES + 1
+    # The least recently used result was evicted
+    square(0)
+    assert len(calls) == caching.CACHE_ENTRIES + 2
@@ -0,0 +1,20 @@
+import pandas as pd
+from nbanalyzer.compact import compact_frame, concat_frames, recast
+
+def season(players: list[str]) -> pd.DataFrame:
+    return compact_frame(pd.DataFrame({'Player': players, 'Tm': 'LAL', 'PTS': range(len(players))}))[0]
+
+def test_frames_compacted_before_a_dictionary_grew_still_combine():
+    earlier = season(['Kareem Abdul-Jabbar', 'Magic Johnson'])
+    later = season(['LeBron James', 'Anthony Davis'])
+    assert earlier['Player'].dtype != later['Player'].dtype
+
+    stacked = concat_frames({1985: earlier, 2020: later}, names=['Season', 'Row'])
+    assert isinstance(stacked['Player'].dtype, pd.CategoricalDtype)
+    assert list(stacked['Player']) == ['Kareem Abdul-Jabbar', 'Magic Johnson', 'LeBron James', 'Anthony Davis']
+    assert recast(earlier)['Player'].dtype == later['Player'].dtype
+    assert (recast(earlier)['Player'] == later['Player']).tolist() == [False, False]
+
+def test_recast_keeps_frames_already_on_the_shared_dtypes():
+    frame = season(['Larry Bird'])
+    assert recast(frame) is frame
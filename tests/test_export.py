@@ -0,0 +1,64 @@
+import io
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+import pytest
+from nbanalyzer import export, history, warehouse
+from nbanalyzer.compact import compact_frame
+
+def read_back(data: bytes, fmt: str) -> pa.Table:
+    if fmt == 'csv':
+        return pa_csv.read_csv(io.BytesIO(data))
+    if fmt == 'parquet':
+        return pq.read_table(io.BytesIO(data))
+    return pa.ipc.open_file(io.BytesIO(data)).read_all()
+
+def partition(points: list[int], extra: bool = False) -> pd.DataFrame:
+    df = pd.DataFrame({'Player': [f'Player {i}' for i in range(len(points))], 'PTS': points,
+                       'TS%': np.linspace(.5, .6, len(points))}, index=pd.Index([f'p{i}' for i in range(len(points))], name='PlayerID'))
+    if extra:
+        df['3PA'] = 1.5
+    return compact_frame(df)[0]
+
+@pytest.mark.parametrize('fmt', list(export.EXPORT_FORMATS))
+def test_write_seasons_widens_types_and_keeps_every_column(monkeypatch, tmp_path, fmt):
+    monkeypatch.setattr(warehouse, 'WAREHOUSE_DIR', str(tmp_path))
+    # Downcast on their own, the first season fits int8 and the second needs int16
+    partitions = {1990: partition([12, 40]), 2022: partition([5820, 31], extra=True)}
+    assert partitions[1990]['PTS'].dtype == np.int8
+    monkeypatch.setattr(export, 'season_partitions', lambda seasons, stat_type: ((season, partitions[season]) for season in seasons))
+
+    sink = io.BytesIO()
+    assert export.write_seasons([1990, 2022], 'totals', fmt, sink) == 4
+    table = read_back(sink.getvalue(), fmt)
+    assert table.column_names == ['PlayerID', 'Season', 'Player', 'PTS', 'TS%', '3PA']
+    assert table['PTS'].to_pylist() == [12, 40, 5820, 31]
+    assert table['3PA'].to_pylist() == [None, None, 1.5, 1.5]
+
+def test_unify_schemas_promotes_conflicting_types():
+    schema = export.unify_schemas([pa.schema([('G', pa.int8()), ('3P%', pa.float32()), ('Note', pa.int16())]),
+                                   pa.schema([('G', pa.int16()), ('3P%', pa.null()), ('Note', pa.string())])])
+    assert schema == pa.schema([('G', pa.int64()), ('3P%', pa.float64()), ('Note', pa.string())])
+
+def test_schemas_of_stored_partitions_come_from_their_metadata(monkeypatch, tmp_path):
+    monkeypatch.setattr(warehouse, 'WAREHOUSE_DIR', str(tmp_path))
+    loaded = []
+    load_partition = history.load_partition
+    monkeypatch.setattr(history, 'load_partition', lambda season, *args: loaded.append(season) or load_partition(season, *args))
+
+    # 1990 is stored beforehand, 2022 is only loaded once by the schema pass
+    stored = history.load_partition(1990, 'totals')
+    loaded.clear()
+    schema = export.season_schemas([1990, 2022], 'totals')[0]
+    assert export.unify_schemas([schema]) == export.unify_schemas([export.arrow_schema(export._with_season(1990, stored))])
+    assert loaded == [2022]
+
+    loaded.clear()
+    sink = io.BytesIO()
+    rows = export.write_seasons([1990, 2022], 'totals', 'parquet', sink)
+    assert loaded == [1990, 2022]
+    table = read_back(sink.getvalue(), 'parquet')
+    assert table.num_rows == rows
+    assert table.column_names[:3] == ['PlayerID', 'Season', 'Player']
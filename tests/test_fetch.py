@@ -0,0 +1,82 @@
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+from conftest import FIXTURES
+from nbanalyzer.basketball_reference_api import players_data_url
+from nbanalyzer.fetch import Fetcher
+from nbanalyzer.stub_server import serve
+
+URL = 'https://www.basketball-reference.com/leagues/NBA_2022_per_game.html'
+
+def response(status: int, text: str = '', headers: dict = None) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = text.encode()
+    resp.headers = CaseInsensitiveDict(headers or {})
+    resp.url = URL
+    return resp
+
+class FakeSession:
+    """
+    Answers with the queued responses in order, exceptions in the queue are raised, and records the headers of every request
+    """
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append(headers)
+        answer = self.responses.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+def fetcher(session: FakeSession, retries: int = 2) -> Fetcher:
+    fetcher = Fetcher(retries=retries, backoff=0)
+    fetcher.session = session
+    return fetcher
+
+def test_conditional_get_against_stub_server():
+    server = serve(FIXTURES)
+    try:
+        url = players_data_url(2022, 'totals', server.base_url)
+        page = Fetcher().get(url)
+        assert page.text and page.etag and page.last_modified
+        again = Fetcher().get(url, page.etag, page.last_modified)
+        assert again.not_modified and again.etag == page.etag and again.last_modified == page.last_modified
+        assert server.requests == 2
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_validators_are_sent_as_conditional_headers():
+    session = FakeSession(response(304))
+    page = fetcher(session).get(URL, '"abc"', 'Wed, 01 Jun 2022 00:00:00 GMT')
+    assert page.not_modified
+    assert session.requests == [{'If-None-Match': '"abc"', 'If-Modified-Since': 'Wed, 01 Jun 2022 00:00:00 GMT'}]
+
+def test_server_errors_are_retried():
+    session = FakeSession(response(503), response(502, headers={'Retry-After': '0'}), response(200, 'page', {'ETag': '"v1"'}))
+    page = fetcher(session).get(URL)
+    assert page.text == 'page' and page.etag == '"v1"'
+    assert len(session.requests) == 3
+
+def test_connection_errors_are_retried():
+    session = FakeSession(requests.ConnectionError(), response(200, 'page'))
+    assert fetcher(session).get(URL).text == 'page'
+
+def test_exhausted_retries_raise():
+    session = FakeSession(response(500), response(500), response(500))
+    with pytest.raises(requests.HTTPError):
+        fetcher(session, retries=2).get(URL)
+    assert len(session.requests) == 3
+
+    session = FakeSession(*[requests.Timeout()] * 3)
+    with pytest.raises(requests.Timeout):
+        fetcher(session, retries=2).get(URL)
+
+def test_client_errors_are_not_retried():
+    session = FakeSession(response(404), response(200, 'page'))
+    with pytest.raises(requests.HTTPError):
+        fetcher(session).get(URL)
+    assert len(session.requests) == 1
@@ -0,0 +1,52 @@
+import os
+from nbanalyzer import figure_cache, warehouse
+from nbanalyzer.figure_cache import FigureCache, figure_key
+
+PAST_SEASON = 1990
+
+def test_memory_entries_are_bounded(tmp_path):
+    cache = FigureCache(str(tmp_path), memory_entries=2)
+    for key in 'abc':
+        cache.put(key, 'png', key.encode())
+    assert list(cache._memory) == ['b', 'c']
+    # Evicted from memory, still on disk
+    assert cache.get('a', PAST_SEASON, 'png') == b'a'
+    assert list(cache._memory) == ['c', 'a']
+
+def test_disk_entries_are_read_back_after_clear(tmp_path):
+    cache = FigureCache(str(tmp_path))
+    cache.put('key', 'json', b'{}')
+    cache.clear()
+    assert not cache._memory
+    assert cache.get('key', PAST_SEASON, 'json') == b'{}'
+    assert FigureCache(str(tmp_path)).get('key', PAST_SEASON, 'json') == b'{}'
+
+def test_disk_entries_are_bounded(tmp_path):
+    cache = FigureCache(str(tmp_path), disk_entries=2)
+    for key in 'abc':
+        cache.put(key, 'png', key.encode())
+    assert len(os.listdir(tmp_path)) == 2
+
+def test_current_season_entries_expire(tmp_path, monkeypatch):
+    cache = FigureCache(str(tmp_path))
+    cache.put('past', 'png', b'past')
+    cache.put('current', 'png', b'current')
+    monkeypatch.setattr(warehouse, 'CURRENT_SEASON_TTL', 0)
+    assert cache.get('current', warehouse.current_season(), 'png') is None
+    cache.clear()
+    assert cache.get('current', warehouse.current_season(), 'png') is None
+    assert cache.get('past', PAST_SEASON, 'png') == b'past'
+
+def test_key_changes_with_the_figure_code_and_version(monkeypatch):
+    def plot(season, players):
+        return season
+
+    def changed_plot(season, players):
+        return season + 0
+
+    changed_plot.__qualname__ = plot.__qualname__
+    key = figure_key(plot, (PAST_SEASON, ['Larry Bird*']), {})
+    assert figure_key(plot, (PAST_SEASON, ['Larry Bird*']), {}) == key
+    assert figure_key(changed_plot, (PAST_SEASON, ['Larry Bird*']), {}) != key
+    monkeypatch.setattr(figure_cache, 'FIGURE_CACHE_VERSION', figure_cache.FIGURE_CACHE_VERSION + 1)
+    assert figure_key(plot, (PAST_SEASON, ['Larry Bird*']), {}) != key
@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+from nbanalyzer import history
+from nbanalyzer.basketball_reference_api import load_players_data
+
+def test_shooting_trends_count_every_player():
+    totals = load_players_data(2022, 'totals', filter_games=False)
+    trends = history.shooting_trends([2022])
+    assert trends.loc[2022, '3PA'] == totals['3PA'].sum()
+    assert trends.loc[2022, 'FGA'] == totals['FGA'].sum()
+
+def test_correlation_by_era_matches_pandas_over_every_season(monkeypatch):
+    partitions = {1990: pd.DataFrame({'PTS': [10., 20, 30, 25], 'AST': [1., 5, 2, 8]}),
+                  1991: pd.DataFrame({'PTS': [12., 18, 27], 'AST': [3., 2, 9], '3P': [.5, np.nan, 2.1]}),
+                  1992: pd.DataFrame({'PTS': [8., 22, 31, 15], 'AST': [4., 6, 1, 7], '3P': [1.2, .4, 2.8, .9]})}
+
+    def season_partitions(seasons, stat_type, columns=None):
+        return ((season, partitions[season] if columns is None else partitions[season][columns]) for season in seasons)
+
+    monkeypatch.setattr(history, 'season_partitions', season_partitions)
+    correlations = history.correlation_by_era([1990, 1991, 1992])
+
+    # The 3P column first appears in the second season of the era and is still part of its matrix
+    expected = pd.concat(partitions.values(), ignore_index=True).corr()
+    assert list(correlations['1990s'].columns) == ['PTS', 'AST', '3P']
+    pd.testing.assert_frame_equal(correlations['1990s'], expected.loc[['PTS', 'AST', '3P'], ['PTS', 'AST', '3P']])
@@ -0,0 +1,51 @@
+import logging
+import os
+import subprocess
+import sys
+from conftest import FIXTURES, ROOT
+from nbanalyzer import instrumentation
+from nbanalyzer.basketball_reference_api import players_data_url
+from nbanalyzer.fetch import Fetcher
+
+def test_import_installs_no_sink():
+    env = {**os.environ, 'NBANALYZER_METRICS': 'logging'}
+    code = 'import nbanalyzer.report; from nbanalyzer.instrumentation import get_sink; print(get_sink())'
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, capture_output=True, text=True, check=True).stdout
+    assert output.strip() == 'None'
+
+def unconfigured(monkeypatch):
+    monkeypatch.setattr(instrumentation, '_configured', False)
+    monkeypatch.setattr(instrumentation, '_sink', None)
+    monkeypatch.setattr(instrumentation.logger, 'handlers', [])
+    monkeypatch.setattr(instrumentation.logger, 'level', logging.NOTSET)
+
+def test_configure_from_env_installs_a_sink_once(monkeypatch):
+    unconfigured(monkeypatch)
+    sink = instrumentation.configure_from_env('logging')
+    assert isinstance(sink, instrumentation.LoggingSink)
+    assert instrumentation.configure_from_env('prometheus') is sink
+
+def test_payload_sizes_are_bytes(monkeypatch):
+    sink = instrumentation.MemorySink()
+    monkeypatch.setattr(instrumentation, '_sink', sink)
+    # Player names with accents take more bytes than characters
+    url = players_data_url(2022, 'per_game', os.path.join(FIXTURES, ''))
+    Fetcher().get(url)
+    assert sink.values('size', 'payload') == [os.path.getsize(url)]
+
+def test_logging_sink_records_reach_a_handler(monkeypatch):
+    unconfigured(monkeypatch)
+    monkeypatch.setattr(logging.getLogger(), 'handlers', [])
+    instrumentation.configure_from_env('logging')
+    records = []
+    handler, = instrumentation.logger.handlers
+    monkeypatch.setattr(handler, 'emit', records.append)
+    instrumentation.count('cache_hit', cache='warehouse')
+    assert [record.getMessage() for record in records] == ['count cache_hit 1 cache=warehouse']
+
+def test_ingest_logs_metrics(tmp_path):
+    env = {**os.environ, 'NBANALYZER_METRICS': 'logging', 'NBANALYZER_WAREHOUSE': str(tmp_path)}
+    result = subprocess.run([sys.executable, '-m', 'nbanalyzer.ingest', '--seasons', '2022', '--stats', 'per_game'], cwd=ROOT,
+                            env=env, capture_output=True, text=True, check=True)
+    assert 'timing parse' in result.stderr
+    assert result.stdout.strip() == '1 stored, 0 not_modified, 0 fresh, 0 failed'
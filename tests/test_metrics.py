@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+from nbanalyzer.basketball_reference_api import spacing, box_creation, offensive_load
+from nbanalyzer.metrics import advanced_metrics_table
+
+LEAGUE_AVG_EFG = .532
+
+def per_100_fixture() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    rows = 50
+    per_100 = pd.DataFrame({
+        'Player': [f'Player {i}' for i in range(rows)],
+        'Pos': rng.choice(['PG', 'SG', 'SF', 'PF', 'C'], rows),
+        'Tm': rng.choice(['BOS', 'DEN', 'LAL'], rows),
+        'PTS': rng.uniform(5, 45, rows),
+        '3PA': rng.uniform(0, 15, rows),
+        '3P%': rng.uniform(0, .5, rows),
+        'AST': rng.uniform(0, 14, rows),
+        'TOV': rng.uniform(0, 6, rows),
+        'FGA': rng.uniform(5, 35, rows),
+        'FTA': rng.uniform(0, 14, rows),
+        'TS%': rng.uniform(.4, .7, rows),
+    }, index=pd.Index([f'player-{i}' for i in range(rows)], name='PlayerID'))
+    # Players without a 3 point attempt
+    per_100.iloc[:3, per_100.columns.get_indexer(['3PA', '3P%'])] = 0.
+    return per_100
+
+def test_advanced_metrics_table_matches_scalar_formulas():
+    per_100 = per_100_fixture()
+    metrics = advanced_metrics_table(per_100, per_100['TS%'], LEAGUE_AVG_EFG)
+
+    rows = per_100[['PTS', '3PA', '3P%', 'AST', 'TOV', 'FGA', 'FTA']].to_numpy().tolist()
+    expected_spacing = [spacing(attempts, percentage, LEAGUE_AVG_EFG) for _, attempts, percentage, *_ in rows]
+    expected_creation = [box_creation(ast, pts, attempts, percentage, tov) for pts, attempts, percentage, ast, tov, *_ in rows]
+    expected_load = [offensive_load(ast, fga, fta, tov, creation)
+                     for (_, _, _, ast, tov, fga, fta), creation in zip(rows, expected_creation)]
+
+    np.testing.assert_allclose(metrics['Spacing'], expected_spacing)
+    np.testing.assert_allclose(metrics['Creation'], expected_creation)
+    np.testing.assert_allclose(metrics['Offensive Load'], expected_load)
+    np.testing.assert_allclose(metrics['Scoring Rate'], per_100['PTS'])
+    np.testing.assert_allclose(metrics['Efficiency(TS%)'], per_100['TS%'])
+    assert metrics.index.equals(per_100.index)
+    assert list(metrics['Player']) == list(per_100['Player'])
+
+def test_advanced_metrics_table_accepts_a_league_average_per_row():
+    per_100 = per_100_fixture()
+    league_avg_efg = np.where(np.arange(len(per_100)) % 2, .5, .55)
+    metrics = advanced_metrics_table(per_100, per_100['TS%'], league_avg_efg)
+    expected = [spacing(attempts, percentage, efg) for attempts, percentage, efg in zip(per_100['3PA'], per_100['3P%'], league_avg_efg)]
+    np.testing.assert_allclose(metrics['Spacing'], expected)
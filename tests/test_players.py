@@ -0,0 +1,27 @@
+import pandas as pd
+from nbanalyzer.basketball_reference_api import parse_players_data
+from nbanalyzer.players import index_by_player, player_id
+
+def test_player_id_drops_accents_and_hall_of_fame_mark():
+    assert player_id('Nikola Jokić') == 'nikola-jokic'
+    assert player_id('Larry Bird*') == 'larry-bird'
+
+def test_players_sharing_a_name_get_their_own_id():
+    # A traded Marcus Williams, then another Marcus Williams on a single team
+    df = pd.DataFrame({'Player': ['Chris Paul', 'Marcus Williams', 'Marcus Williams', 'Marcus Williams', 'Marcus Williams'],
+                       'Tm': ['NOH', 'TOT', 'NJN', 'SAS', 'LAC'], 'G': [78, 56, 30, 26, 40]})
+    assert list(index_by_player(df).index) == ['chris-paul', 'marcus-williams', 'marcus-williams', 'marcus-williams',
+                                               'marcus-williams-2']
+
+def test_adjacent_players_sharing_a_name_are_not_merged():
+    df = pd.DataFrame({'Player': ['Tony Mitchell', 'Tony Mitchell'], 'Tm': ['DET', 'MIL']})
+    assert list(index_by_player(df).index) == ['tony-mitchell', 'tony-mitchell-2']
+
+def test_parsed_tables_keep_the_total_row_of_traded_players_only():
+    cells = lambda *values: '<tr>' + ''.join(f'<td>{value}</td>' for value in values) + '</tr>'
+    page = ('<table id="totals_stats"><thead><tr><th>Rk</th><th>Player</th><th>Pos</th><th>Tm</th><th>G</th></tr></thead><tbody>'
+            + cells(1, 'Tony Mitchell', 'SF', 'DET', 60) + cells(2, 'Tony Mitchell', 'PF', 'TOT', 50)
+            + cells(2, 'Tony Mitchell', 'PF', 'MIL', 30) + cells(2, 'Tony Mitchell', 'PF', 'ATL', 20) + '</tbody></table>')
+    table = parse_players_data(page, stat_type='totals')
+    assert list(table.index) == ['tony-mitchell', 'tony-mitchell-2']
+    assert list(table['G']) == [60, 50]
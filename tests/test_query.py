@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+from nbanalyzer.basketball_reference_api import get_players_data
+from nbanalyzer.players import player_ids
+from nbanalyzer.query import TableIndex, build_seasons_index, compile_query, get_table_index, run_across
+
+SEASONS = [1990, 2022]
+
+@pytest.fixture(scope='module')
+def table() -> pd.DataFrame:
+    return get_players_data(2022, 'per_game')
+
+def expected_rows(table: pd.DataFrame, teams=None, positions=None, ranges=None, name_prefix='') -> pd.DataFrame:
+    mask = pd.Series(True, index=table.index)
+    if teams is not None:
+        mask &= table['Tm'].isin(teams)
+    if positions is not None:
+        mask &= table['Pos'].isin(positions)
+    for col, (minimum, maximum) in (ranges or {}).items():
+        if minimum is not None:
+            mask &= table[col] >= minimum
+        if maximum is not None:
+            mask &= table[col] <= maximum
+    if name_prefix:
+        mask &= pd.Series(player_ids(table['Player'])).str.startswith(player_ids(pd.Series([name_prefix]))[0]).to_numpy()
+    return table[mask.to_numpy()]
+
+def assert_same_rows(result: pd.DataFrame, expected: pd.DataFrame):
+    pd.testing.assert_frame_equal(result, expected, check_categorical=False)
+
+@pytest.mark.parametrize('teams', [
+    ['LAL'],
+    ['LAL', 'BOS', 'GSW'],
+    [],
+    'all but one',  # more teams selected than left out, the complement branch
+    'all',
+])
+def test_team_selection_matches_pandas(table, teams):
+    every_team = sorted(set(table['Tm'].astype(str)))
+    teams = {'all but one': every_team[1:], 'all': every_team}.get(teams, teams) if isinstance(teams, str) else teams
+    index = TableIndex(table)
+    assert_same_rows(compile_query(teams=teams).run(index), expected_rows(table, teams=teams))
+
+def test_complement_branch_is_taken(table):
+    index = TableIndex(table)
+    teams = index.teams[2:]
+    assert len(teams) > len(index.teams) / 2
+    np.testing.assert_array_equal(index.any_of('Tm', teams), table['Tm'].isin(teams).to_numpy())
+    assert index.any_of('Tm', index.teams) is None
+
+def test_combined_filters_match_pandas(table):
+    ranges = {'PTS': (10, None), 'AST': (None, 6)}
+    query = compile_query(positions=['PG', 'SG', 'C'], ranges=ranges, min_games=40, min_minutes=20)
+    expected = expected_rows(table, positions=['PG', 'SG', 'C'], ranges={**ranges, 'G': (40, None), 'MP': (20, None)})
+    assert 0 < len(expected) < len(table)
+    assert_same_rows(query.run(TableIndex(table), ['Player', 'PTS', 'AST']), expected[['Player', 'PTS', 'AST']])
+
+@pytest.mark.parametrize('prefix', ['Nikola', 'nikola jok', 'NIKOLA JOKIĆ', 'l', 'a', 'zzz', '0', 'Dončić'])
+def test_name_prefix_matches_pandas(table, prefix):
+    assert_same_rows(compile_query(name_prefix=prefix).run(TableIndex(table)), expected_rows(table, name_prefix=prefix))
+
+def test_prefix_bounds_at_both_ends_of_the_sorted_ids(table):
+    index = TableIndex(table)
+    first, last = index.sorted_ids[0], index.sorted_ids[-1]
+    assert index.prefix(first).sum() == (index.sorted_ids == first).sum()
+    assert index.prefix(last).sum() == (index.sorted_ids == last).sum()
+    # Keys sorting before the first id and after the last one
+    assert not index.prefix('0').any()
+    assert not index.prefix('zzzz').any()
+    # Prefixes without letters or digits filter nothing, like an empty prefix
+    assert index.prefix('*').all()
+
+def test_run_across_seasons_matches_the_stacked_index():
+    query = compile_query(teams=['LAL', 'BOS', 'CHI'], min_games=30)
+    across = run_across(query, SEASONS, 'per_game', ['Player', 'Tm', 'G'])
+    stacked = query.run(build_seasons_index(SEASONS, 'per_game'), ['Season', 'Player', 'Tm', 'G'])
+    pd.testing.assert_frame_equal(across, stacked, check_categorical=False)
+
+    expected = pd.concat([expected_rows(get_players_data(season, 'per_game'), teams=['LAL', 'BOS', 'CHI'], ranges={'G': (30, None)})
+                          .assign(Season=season)[['Season', 'Player', 'Tm', 'G']] for season in SEASONS])
+    assert list(stacked['Season']) == list(expected['Season'])
+    assert list(stacked.index) == list(expected.index)
+    assert set(stacked['Season']) == set(SEASONS)
+
+def test_season_selection_on_the_stacked_index():
+    index = build_seasons_index(SEASONS, 'per_game')
+    result = compile_query(seasons=[2022]).run(index)
+    assert set(result['Season']) == {2022}
+    assert len(result) == len(get_table_index(2022, 'per_game'))
@@ -0,0 +1,138 @@
+import os
+import re
+import shutil
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import FIXTURES
+from nbanalyzer import refresh, warehouse
+from nbanalyzer.basketball_reference_api import (ADVANCED_METRIC_INPUTS, advanced_metrics_from, join_tables, league_average_efg,
+                                                 parse_players_data)
+from nbanalyzer.ingest import table_params
+from nbanalyzer.percentiles import build_percentile_index
+from nbanalyzer.players import build_player_index
+
+SEASON = 2022
+STATS = ['per_game', 'per_poss', 'advanced']
+CELL = re.compile(r'<t[hd][^>]*>.*?</t[hd]>')
+
+class Site:
+    """
+    A copy of the recorded pages whose player rows can be edited between refreshes
+    """
+    def __init__(self, directory: str):
+        shutil.copytree(FIXTURES, directory)
+        self.base_url = os.path.join(directory, '')
+
+    def path(self, stat_type: str) -> str:
+        return os.path.join(self.base_url, 'leagues', f'NBA_{SEASON}_{stat_type}.html')
+
+    def edit(self, stat_type: str, edit_rows) -> None:
+        with open(self.path(stat_type), encoding='utf-8') as f:
+            page = f.read()
+        body_start = page.index('<tbody>') + len('<tbody>')
+        body_end = page.index('</tbody>')
+        columns = [re.sub('<[^>]+>', '', cell) for cell in CELL.findall(page[:body_start])]
+        rows = re.findall(r'<tr[^>]*>.*?</tr>', page[body_start:body_end])
+        rows = edit_rows(columns, rows)
+        with open(self.path(stat_type), 'w', encoding='utf-8') as f:
+            f.write(page[:body_start] + '\n'.join(rows) + page[body_end:])
+
+    def set_value(self, stat_type: str, player: str, column: str, value) -> None:
+        def edit_rows(columns, rows):
+            edited = []
+            for row in rows:
+                if f'>{player}<' in row:
+                    cells = CELL.findall(row)
+                    cells[columns.index(column)] = f'<td>{value}</td>'
+                    row = '<tr>' + ''.join(cells) + '</tr>'
+                edited.append(row)
+            return edited
+        self.edit(stat_type, edit_rows)
+
+    def remove(self, stat_type: str, player: str) -> None:
+        self.edit(stat_type, lambda columns, rows: [row for row in rows if f'>{player}<' not in row])
+
+    def add(self, stat_type: str, like: str, player: str) -> None:
+        def edit_rows(columns, rows):
+            row = next(row for row in rows if f'>{like}<' in row)
+            return rows + [row.replace(f'>{like}<', f'>{player}<')]
+        self.edit(stat_type, edit_rows)
+
+    def table(self, stat_type: str) -> pd.DataFrame:
+        with open(self.path(stat_type), encoding='utf-8') as f:
+            return parse_players_data(f.read(), **table_params(stat_type), stat_type=stat_type)
+
+@pytest.fixture
+def site(tmp_path, monkeypatch):
+    monkeypatch.setattr(warehouse, 'WAREHOUSE_DIR', str(tmp_path / 'warehouse'))
+    site = Site(str(tmp_path / 'site'))
+    refresh.refresh_season(SEASON, STATS, base_url=site.base_url)
+    return site
+
+@pytest.fixture
+def recomputed(monkeypatch):
+    # Number of players each call of advanced_metrics_from computes
+    sizes = []
+    compute = refresh.advanced_metrics_from
+    monkeypatch.setattr(refresh, 'advanced_metrics_from', lambda per_100, efg: sizes.append(len(per_100)) or compute(per_100, efg))
+    return sizes
+
+def stored(stat_type: str, **params) -> pd.DataFrame:
+    return warehouse.read_table(SEASON, stat_type, **params)
+
+def assert_matches_full_recompute(site: Site):
+    tables = {stat_type: site.table(stat_type) for stat_type in STATS}
+    players = build_player_index(tables['per_game'], SEASON)
+    for stat_type in STATS:
+        pd.testing.assert_frame_equal(stored(stat_type, **table_params(stat_type)), tables[stat_type], check_dtype=False,
+                                      check_categorical=False)
+
+    metrics = advanced_metrics_from(join_tables(players, tables, ADVANCED_METRIC_INPUTS), league_average_efg(tables['per_game']))
+    pd.testing.assert_frame_equal(stored('advanced_box_score'), metrics, check_dtype=False, check_categorical=False, atol=1e-6)
+    percentiles = build_percentile_index(metrics, refresh.METRIC_COLS)
+    pd.testing.assert_frame_equal(stored('percentiles'), percentiles, check_dtype=False, atol=1e-9)
+
+def test_first_refresh_stores_every_table(site):
+    assert warehouse.season_version(SEASON) == 1
+    assert_matches_full_recompute(site)
+
+def test_unchanged_pages_leave_the_season_version_alone(site, recomputed):
+    summary = refresh.refresh_season(SEASON, STATS, base_url=site.base_url)
+    assert summary == {'per_game': 0, 'per_poss': 0, 'advanced': 0, 'percentiles': 0, 'version': 1}
+    assert warehouse.season_version(SEASON) == 1
+    assert recomputed == []
+
+def test_changed_row_recomputes_its_player_only(site, recomputed):
+    site.set_value('per_poss', 'Joel Embiid', 'AST', '9.9')
+    summary = refresh.refresh_season(SEASON, STATS, base_url=site.base_url)
+    assert summary['per_poss'] == 1 and summary['per_game'] == 0 and summary['version'] == 2
+    assert recomputed == [1]
+    # Only the creation and offensive load of one player moved, the other percentiles were kept
+    assert summary['percentiles'] == 2
+    assert_matches_full_recompute(site)
+
+def test_added_and_removed_rows_keep_the_page_order(site):
+    site.remove('per_poss', 'Joel Embiid')
+    site.add('advanced', 'Nikola Jokić', 'Rookie Jokić')
+    summary = refresh.refresh_season(SEASON, STATS, base_url=site.base_url)
+    assert summary['per_poss'] == 1 and summary['advanced'] == 1 and summary['version'] == 2
+
+    per_poss, advanced = stored('per_poss', **table_params('per_poss')), stored('advanced', **table_params('advanced'))
+    assert 'joel-embiid' not in per_poss.index
+    assert advanced.index[-1] == 'rookie-jokic'
+    assert list(per_poss.index) == list(site.table('per_poss').index)
+    # The removed player has no metrics left, the added one has no per game row and is not a player of the season
+    assert 'joel-embiid' not in stored('advanced_box_score').index
+    assert 'rookie-jokic' not in stored('advanced_box_score').index
+    assert_matches_full_recompute(site)
+
+def test_league_efg_change_recomputes_every_player(site, recomputed):
+    players = len(stored('advanced_box_score'))
+    efg = league_average_efg(site.table('per_game'))
+    site.set_value('per_game', 'Joel Embiid', 'eFG%', '.999')
+    summary = refresh.refresh_season(SEASON, STATS, base_url=site.base_url)
+    assert summary['per_game'] == 1 and summary['version'] == 2
+    assert not np.isclose(league_average_efg(site.table('per_game')), efg)
+    assert recomputed == [players]
+    assert_matches_full_recompute(site)
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import pytest
+from nbanalyzer import rendering
+from nbanalyzer.rendering import DENSITY_BINS, downsample, highlighted, render_mode, scatter_trace
+
+def cloud(points: int, seed: int = 0) -> pd.DataFrame:
+    # A dense cluster with a few outliers far away from it
+    rng = np.random.default_rng(seed)
+    x, y = rng.normal(0, 1, points), rng.normal(0, 1, points)
+    x[:5], y[:5] = [40, -40, 40, -40, 0], [40, 40, -40, -40, 60]
+    return pd.DataFrame({'Player': [f'Player {i}' for i in range(points)], 'x': x, 'y': y})
+
+@pytest.mark.parametrize('max_points', [50, 500, 2999])
+def test_downsample_never_exceeds_max_points(max_points):
+    df = cloud(3000)
+    sample = downsample(df, 'x', 'y', max_points=max_points)
+    assert len(sample) <= max_points
+    # The per cell cap is the largest that fits, one more point per crowded cell would not
+    cells = rendering._bins(df['x'].to_numpy()) * DENSITY_BINS + rendering._bins(df['y'].to_numpy())
+    cap = np.bincount(cells[df.index.isin(sample.index)]).max()
+    assert np.minimum(np.bincount(cells), cap + 1).sum() > max_points
+
+def test_downsample_keeps_outliers_and_highlighted_players():
+    df = cloud(3000)
+    keep = highlighted(df, ['Player 100', 'Player 200', 'player 300'])
+    sample = downsample(df, 'x', 'y', keep, max_points=100)
+    assert len(sample) <= 100
+    assert {'Player 100', 'Player 200', 'Player 300'} <= set(sample['Player'])
+    assert set(df['Player'][:5]) <= set(sample['Player'])
+
+def test_downsample_returns_every_kept_row_over_the_budget():
+    df = cloud(1000)
+    keep = np.zeros(len(df), dtype=bool)
+    keep[::10] = True
+    sample = downsample(df, 'x', 'y', keep, max_points=50)
+    assert list(sample.index) == list(df.index[keep])
+
+@pytest.mark.parametrize('max_points', [0, 5000])
+def test_small_or_unbounded_plots_are_not_thinned(max_points):
+    df = cloud(3000)
+    assert downsample(df, 'x', 'y', max_points=max_points) is df
+
+def test_downsample_is_deterministic():
+    df = cloud(3000)
+    assert list(downsample(df, 'x', 'y', max_points=300).index) == list(downsample(df, 'x', 'y', max_points=300).index)
+
+def test_trace_type_switches_at_webgl_threshold(monkeypatch):
+    monkeypatch.setattr(rendering, 'WEBGL_THRESHOLD', 1000)
+    assert render_mode(1000) == 'svg' and scatter_trace(1000) is go.Scatter
+    assert render_mode(1001) == 'webgl' and scatter_trace(1001) is go.Scattergl
+
+def test_highlighted_matches_names_by_player_id():
+    df = pd.DataFrame({'Player': ['Larry Bird*', 'Nikola Jokić', 'Magic Johnson*']})
+    assert highlighted(df, ['Larry Bird', 'Nikola Jokic']).tolist() == [True, True, False]
+    assert not highlighted(df, None).any() and not highlighted(df, pd.Series([], dtype=object)).any()
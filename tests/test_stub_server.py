@@ -0,0 +1,78 @@
+import os
+import pandas as pd
+import pytest
+import requests
+from conftest import FIXTURES
+from nbanalyzer import warehouse
+from nbanalyzer.basketball_reference_api import parse_players_data, players_data_url
+from nbanalyzer.fetch import make_fetcher
+from nbanalyzer.ingest import ingest, parse_stats, table_params
+from nbanalyzer.stub_server import serve
+
+SITE = 'https://www.basketball-reference.com/'
+
+def fixture_text(*path: str) -> str:
+    with open(os.path.join(FIXTURES, *path), encoding='utf-8') as f:
+        return f.read()
+
+@pytest.fixture
+def server():
+    server = serve(FIXTURES)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def test_ingest_through_stub_server(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(warehouse, 'WAREHOUSE_DIR', str(tmp_path))
+    summary = ingest([1990, 2022], ['totals', 'advanced', 'mvp'], base_url=server.base_url)
+    assert summary == {'stored': 6, 'not_modified': 0, 'fresh': 0, 'failed': 0}
+    assert server.requests == 6
+
+    stored = warehouse.load_table(1990, 'totals', **table_params('totals'))
+    expected = parse_players_data(fixture_text('leagues', 'NBA_1990_totals.html'), **table_params('totals'), stat_type='totals')
+    pd.testing.assert_frame_equal(stored, expected, check_dtype=False, check_categorical=False)
+    assert ingest([1990, 2022], ['totals', 'advanced', 'mvp'], base_url=server.base_url)['fresh'] == 6
+
+def test_missing_season_fails_without_stopping_the_ingest(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(warehouse, 'WAREHOUSE_DIR', str(tmp_path))
+    summary = ingest([1985, 1990], ['per_game'], base_url=server.base_url)
+    assert summary['stored'] == 1 and summary['failed'] == 1
+
+def test_play_by_play_is_not_requested_before_it_is_published(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(warehouse, 'WAREHOUSE_DIR', str(tmp_path))
+    summary = ingest([1990], parse_stats('all'), base_url=server.base_url)
+    assert summary == {'stored': 6, 'not_modified': 0, 'fresh': 0, 'failed': 0}
+    assert server.requests == 6
+
+def test_stub_server_answers_conditional_requests(server):
+    url = players_data_url(2022, 'per_game', server.base_url)
+    page = requests.get(url)
+    assert page.status_code == 200 and page.text == fixture_text('leagues', 'NBA_2022_per_game.html')
+    assert page.headers['Last-Modified']
+    assert requests.get(url, headers={'If-None-Match': page.headers['ETag']}).status_code == 304
+    assert requests.get(f'{server.base_url}leagues/NBA_1900_per_game.html').status_code == 404
+    assert requests.get(f'{server.base_url}../conftest.py').status_code == 404
+
+def test_stub_server_rate_limit():
+    server = serve(FIXTURES, rate_limit=1)
+    try:
+        url = players_data_url(2022, 'totals', server.base_url)
+        statuses = [requests.get(url).status_code for _ in range(3)]
+        assert statuses[0] == 200 and 429 in statuses
+        assert server.throttled == statuses.count(429)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_record_then_replay(server, tmp_path):
+    recorder = make_fetcher('record', str(tmp_path))
+    recorded = recorder.get(players_data_url(2022, 'advanced', server.base_url))
+    assert (tmp_path / 'leagues' / 'NBA_2022_advanced.html').read_text(encoding='utf-8') == recorded.text
+
+    # Replayed pages are looked up by path whatever the host they were recorded from
+    replayer = make_fetcher('replay', str(tmp_path))
+    replayed = replayer.get(players_data_url(2022, 'advanced', SITE))
+    assert replayed.text == recorded.text
+    assert replayer.get(replayed.url, etag=replayed.etag).not_modified
+    with pytest.raises(FileNotFoundError):
+        replayer.get(players_data_url(2022, 'totals', SITE))
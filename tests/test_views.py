@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+from nbanalyzer import basketball_reference_api as api
+from nbanalyzer.query import compile_query, get_table_index
+
+def test_callers_cannot_change_the_cached_tables():
+    cached = api.get_players_data(2022, 'per_poss')
+    points, rows = cached['PTS'].to_numpy().copy(), len(cached)
+
+    df = api.get_players_data(2022, 'per_poss')
+    df['PTS'] = df['PTS'] * .75
+    df.drop(df.index[:10], inplace=True)
+    df.drop(columns=['AST'], inplace=True)
+    with pytest.raises(ValueError):
+        df['TOV'].to_numpy()[0] = 0
+
+    again = api.get_players_data(2022, 'per_poss')
+    assert len(again) == rows and 'AST' in again
+    np.testing.assert_array_equal(again['PTS'].to_numpy(), points)
+
+@pytest.mark.parametrize('getter', [api.get_advanced_metrics, api.get_percentile_index, api.get_player_index])
+def test_season_tables_are_returned_as_copies(getter):
+    df = getter(2022)
+    df.drop(df.index[:5], inplace=True)
+    df['Extra'] = 1
+    assert len(getter(2022)) == len(df) + 5 and 'Extra' not in getter(2022)
+
+def test_query_results_do_not_reach_the_index():
+    index = get_table_index(2022, 'per_game')
+    result = compile_query().run(index)
+    result.drop(result.index[:5], inplace=True)
+    assert len(compile_query().run(index)) == len(index)